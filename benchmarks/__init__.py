@@ -0,0 +1,4 @@
+"""Benchmarks for mir.frelia hot paths.
+
+Run with python -m benchmarks.run --help.
+"""
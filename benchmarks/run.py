@@ -0,0 +1,247 @@
+"""Run benchmarks on a synthetic site.
+
+Each benchmark reports throughput in items per second and peak traced memory.
+Results can be saved as a baseline and later runs compared against it:
+
+    python -m benchmarks.run --pages 2000 --save benchmarks/baseline.json
+    python -m benchmarks.run --pages 2000 --baseline benchmarks/baseline.json
+
+The comparison exits with status 1 if any benchmark's throughput regressed by
+more than the threshold.  Everything runs locally in a temporary directory.
+"""
+
+import argparse
+import collections
+import datetime
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from mir.frelia import alchemy
+from mir.frelia import atom
+import mir.frelia.enja as enja
+import mir.frelia.fs as fslib
+import mir.frelia.page as pagelib
+from mir.frelia import sitemap
+
+from benchmarks import sitegen
+
+BASE_MAPPING = {
+    'site': {'title': 'Example site', 'url': 'http://example.com/'},
+    'author': {'name': 'Nobody'},
+}
+
+_BENCHMARKS = collections.OrderedDict()
+
+
+def _benchmark(function):
+    _BENCHMARKS[function.__name__] = function
+    return function
+
+
+@_benchmark
+def enja_load(site):
+    load = enja.load
+    for path in site.paths:
+        with open(path, 'rb') as file:
+            load(file)
+    return len(site.paths)
+
+
+@_benchmark
+def load_pages(site):
+    return sum(1 for page in pagelib.load_pages(site.rootdir))
+
+
+@_benchmark
+def render(site):
+    render = alchemy.render
+    for page in site.pages:
+        render(page, BASE_MAPPING)
+    return len(site.pages)
+
+
+@_benchmark
+def template_renderer(site):
+    render = alchemy.TemplateRenderer(BASE_MAPPING).render
+    for page in site.pages:
+        render(page)
+    return len(site.pages)
+
+
+@_benchmark
+def flatten_mapping(site):
+    flatten = alchemy._flatten_mapping
+    for header in site.headers:
+        flatten(header)
+    return len(site.headers)
+
+
+@_benchmark
+def parse_date_from_path(site):
+    parse_date = alchemy.parse_date_from_path
+    for path in site.paths:
+        parse_date(path)
+    return len(site.paths)
+
+
+@_benchmark
+def parse_dates_from_paths(site):
+    for date in alchemy.parse_dates_from_paths(site.paths):
+        pass
+    return len(site.paths)
+
+
+@_benchmark
+def atom_write(site):
+    updated = datetime.datetime(2016, 1, 8)
+    feed = atom.Feed(id='http://example.com/', title='Example site',
+                     updated=updated)
+    feed.entries = (
+        atom.Entry(id=path, title=header['title'], updated=updated)
+        for path, header in zip(site.paths, site.headers))
+    feed.write(io.StringIO())
+    return len(site.paths)
+
+
+@_benchmark
+def atom_entries(site):
+    updated = datetime.datetime(2016, 1, 8)
+    entries = []
+    for path, header in zip(site.paths, site.headers):
+        entry = atom.Entry(id=path, title=header['title'], updated=updated)
+        entry.links.append(atom.Link(path))
+        entry.authors.append(atom.Author(header['author']['name']))
+        entry.categories.extend(atom.Category(tag) for tag in header['tags'])
+        entries.append(entry)
+    return len(entries)
+
+
+@_benchmark
+def sitemap_write(site):
+    urls = (sitemap.URL('http://example.com/' + path) for path in site.paths)
+    sitemap.write_sitemap_urlset(io.StringIO(), urls)
+    return len(site.paths)
+
+
+@_benchmark
+def link_recursively(site):
+    dst_dir = os.path.join(site.workdir, 'linked')
+    shutil.rmtree(dst_dir, ignore_errors=True)
+    fslib.link_recursively(site.rootdir, dst_dir)
+    return len(site.paths)
+
+
+class _Site:
+
+    def __init__(self, workdir, **options):
+        self.workdir = workdir
+        self.rootdir = os.path.join(workdir, 'site')
+        self.paths = sitegen.generate_site(self.rootdir, **options)
+        self.pages = list(pagelib.load_pages(self.rootdir))
+        self.headers = []
+        for path in self.paths:
+            with open(path, 'rb') as file:
+                self.headers.append(enja.load(file).header)
+
+
+def run_benchmarks(site, names, repeat=3):
+    """Run benchmarks, returning a dict of results keyed by name.
+
+    Throughput is taken from the fastest of repeat timed runs.  Peak memory
+    is measured in a separate run with tracemalloc enabled.
+    """
+    results = collections.OrderedDict()
+    for name in names:
+        function = _BENCHMARKS[name]
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            count = function(site)
+            seconds = time.perf_counter() - start
+            if best is None or seconds < best:
+                best = seconds
+        tracemalloc.start()
+        function(site)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {
+            'items': count,
+            'seconds': best,
+            'items_per_second': count / best if best else float('inf'),
+            'peak_memory': peak,
+        }
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return the names of benchmarks that regressed against a baseline."""
+    regressions = []
+    for name, result in results.items():
+        try:
+            expected = baseline[name]['items_per_second']
+        except KeyError:
+            continue
+        if result['items_per_second'] < expected * (1 - threshold):
+            regressions.append(name)
+    return regressions
+
+
+def _print_results(results, baseline, file):
+    file.write('{:<24} {:>12} {:>12} {:>10}\n'.format(
+        'benchmark', 'items/s', 'peak KiB', 'vs base'))
+    for name, result in results.items():
+        if name in baseline:
+            ratio = '{:.2f}x'.format(result['items_per_second']
+                                     / baseline[name]['items_per_second'])
+        else:
+            ratio = '-'
+        file.write('{:<24} {:>12.0f} {:>12.1f} {:>10}\n'.format(
+            name, result['items_per_second'], result['peak_memory'] / 1024,
+            ratio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--header-keys', type=int, default=10)
+    parser.add_argument('--body-size', type=int, default=2000)
+    parser.add_argument('--depth', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', help='baseline JSON file to compare')
+    parser.add_argument('--save', help='save results as a baseline file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed fractional throughput regression')
+    parser.add_argument('benchmarks', nargs='*',
+                        help='benchmarks to run, default all: '
+                        + ', '.join(_BENCHMARKS))
+    args = parser.parse_args(argv)
+
+    names = args.benchmarks or list(_BENCHMARKS)
+    with tempfile.TemporaryDirectory() as workdir:
+        site = _Site(workdir, pages=args.pages, header_keys=args.header_keys,
+                     body_size=args.body_size, depth=args.depth)
+        results = run_benchmarks(site, names, repeat=args.repeat)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    _print_results(results, baseline, sys.stdout)
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        sys.stdout.write('Regressed: {}\n'.format(', '.join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
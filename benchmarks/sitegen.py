@@ -0,0 +1,59 @@
+"""Synthetic site generator for benchmarks."""
+
+import datetime
+import os
+import random
+
+import mir.frelia.enja as enja
+
+
+def generate_site(rootdir, pages=1000, header_keys=10, body_size=2000,
+                  depth=1, seed=0):
+    """Generate a synthetic site of Enja files.
+
+    Files are written to rootdir/section-*/.../YYYY/MM/DD/post-N.html, with
+    depth levels of section directories.  Each header has header_keys
+    generated keys plus a title, tags and nested author metadata.  Each body
+    is about body_size characters containing a few template placeholders.
+
+    Return a list of the paths of the generated files.
+    """
+    rng = random.Random(seed)
+    start = datetime.date(2010, 1, 1)
+    paths = []
+    for index in range(pages):
+        sections = [
+            'section-{}'.format(rng.randrange(4)) for _ in range(depth)]
+        date = start + datetime.timedelta(days=rng.randrange(3000))
+        dirpath = os.path.join(
+            rootdir, *sections,
+            '{:04}'.format(date.year),
+            '{:02}'.format(date.month),
+            '{:02}'.format(date.day))
+        os.makedirs(dirpath, exist_ok=True)
+        path = os.path.join(dirpath, 'post-{}.html'.format(index))
+        with open(path, 'w') as file:
+            enja.dump(_make_document(rng, index, header_keys, body_size),
+                      file)
+        paths.append(path)
+    return paths
+
+
+def _make_document(rng, index, header_keys, body_size):
+    paragraph = '<p>Post $path on $site_title by $author_name.</p>\n'
+    filler = '<p>' + 'lorem ipsum ' * 8 + '</p>\n'
+    parts = [paragraph]
+    size = len(paragraph)
+    while size < body_size:
+        parts.append(filler)
+        size += len(filler)
+    document = enja.Document(''.join(parts))
+    header = document.header
+    header['title'] = 'Post {}'.format(index)
+    header['tags'] = rng.sample(['atelier', 'sophie', 'firis', 'lydie',
+                                 'sue', 'plachta', 'alchemy'], 3)
+    header['author'] = {'name': 'Author {}'.format(rng.randrange(10)),
+                        'uri': 'http://example.com/'}
+    for key in range(header_keys):
+        header['key{}'.format(key)] = 'value {}'.format(rng.random())
+    return document
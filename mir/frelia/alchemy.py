@@ -15,15 +15,27 @@ Transmutations should:
 - bind used objects to a local variable.
 - return a generator of the results.
 - may or may not mutate the objects in place.
+
+Transmutations can be chained into a single streaming pass with Pipeline,
+which can also run the chain across a process pool.
 """
 
+import calendar
 import collections
 from collections.abc import Mapping
 import datetime
+import functools
+import itertools
 import logging
+import multiprocessing
+import os
 import pathlib
 import string
 
+import mir.frelia.depend as depend
+import mir.frelia.fs as fslib
+import mir.frelia.rendercache as rendercache
+
 logger = logging.getLogger(__name__)
 
 
@@ -39,28 +51,221 @@ def render(page, base_mapping):
     return template.safe_substitute(flat_mapping)
 
 
+class TemplateRenderer:
+
+    """Render pages using Python templates against a shared base mapping.
+
+    This produces the same results as render(), but the base mapping is
+    flattened only once and parsed templates are cached, so rendering many
+    pages against the same base mapping does not redo that work per page.
+
+    If a page's flattened metadata key collides with a flattened base mapping
+    key (e.g. foo_bar and foo: {bar: ...}), the page's value is used.
+
+    If lazy is true, page metadata is looked up through a FlatView instead of
+    being flattened, which is faster for pages with large nested metadata.
+    """
+
+    def __init__(self, base_mapping, cache_size=1024, lazy=False):
+        self._base_mapping = base_mapping
+        self._lazy = lazy
+        self._flat_base, self._base_origins = _flatten_with_origins(
+            base_mapping)
+        # Plain base values can be shadowed in the flat base by nested keys
+        # that flatten to the same name, but are used if page metadata
+        # replaces the nested mapping.
+        self._plain_base = {
+            key: value for key, value in base_mapping.items()
+            if not isinstance(value, Mapping)}
+        self._compile = functools.lru_cache(maxsize=cache_size)(
+            _compile_template)
+        self._fingerprint = None
+
+    def __repr__(self):
+        return ('{cls}(base_mapping={base_mapping!r})'
+                .format(cls=type(self).__qualname__,
+                        base_mapping=self._base_mapping))
+
+    def fingerprint(self, page):
+        """Return bytes identifying the inputs to rendering besides page.
+
+        See mir.frelia.rendercache.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = rendercache.fingerprint(self._base_mapping)
+        return self._fingerprint
+
+    def render(self, page, used_names=None):
+        """Render a page.
+
+        If used_names is a set, the placeholder names that were looked up in
+        the base mapping are added to it, for dependency tracking.
+        """
+        template = self._compile(page.content)
+        metadata = page.metadata
+        if self._lazy:
+            flat_metadata = FlatView(metadata)
+        else:
+            flat_metadata = _flatten_mapping(metadata)
+        flat_base = self._flat_base
+        base_origins = self._base_origins
+        plain_base = self._plain_base
+        parts = list(template.parts)
+        for index, name in template.placeholders:
+            if name in flat_metadata:
+                parts[index] = str(flat_metadata[name])
+                continue
+            if used_names is not None:
+                used_names.add(name)
+            if name in flat_base and base_origins[name] not in metadata:
+                parts[index] = str(flat_base[name])
+            elif name in plain_base and name not in metadata:
+                parts[index] = str(plain_base[name])
+        return ''.join(parts)
+
+
+_CompiledTemplate = collections.namedtuple(
+    '_CompiledTemplate', 'parts placeholders')
+
+
+def _compile_template(content):
+    """Split a Python template into literal and placeholder parts.
+
+    Placeholder parts hold their original text, so that unmatched
+    placeholders are left alone as with safe_substitute().
+
+    >>> template = _compile_template('$$foo ${bar}$baz')
+    >>> template.parts
+    ['', '$', 'foo ', '${bar}', '', '$baz', '']
+    >>> template.placeholders
+    [(3, 'bar'), (5, 'baz')]
+    """
+    parts = []
+    placeholders = []
+    position = 0
+    for match in string.Template.pattern.finditer(content):
+        parts.append(content[position:match.start()])
+        position = match.end()
+        name = match.group('named') or match.group('braced')
+        if name is not None:
+            placeholders.append((len(parts), name))
+            parts.append(match.group())
+        elif match.group('escaped') is not None:
+            parts.append(string.Template.delimiter)
+        else:
+            parts.append(match.group())
+    parts.append(content[position:])
+    return _CompiledTemplate(parts, placeholders)
+
+
+def _flatten_with_origins(mapping, separator='_'):
+    """Flatten nested mappings, recording each flat key's top level key.
+
+    >>> flat, origins = _flatten_with_origins({'foo': {'bar': 'baz'}})
+    >>> flat == {'foo_bar': 'baz'}
+    True
+    >>> origins == {'foo_bar': 'foo'}
+    True
+    """
+    flat_mapping = {}
+    origins = {}
+    for key, value in mapping.items():
+        if not isinstance(value, Mapping):
+            flat_mapping[key] = value
+            origins[key] = key
+    for key, value in _nested_mappings(mapping):
+        new_items = _flatten_mapping(
+            mapping=value,
+            separator=separator,
+            prefix=key + separator)
+        flat_mapping.update(new_items)
+        origins.update(dict.fromkeys(new_items, key))
+    return flat_mapping, origins
+
+
 def _flatten_mapping(mapping, separator='_', prefix=''):
     """Flatten nested mappings.
 
+    Each nested mapping is visited once and its items are written directly
+    into the result, so deep mappings are not copied repeatedly.
+
     >>> got = _flatten_mapping({'foo': {'bar': 'baz'}})
     >>> got == {'foo_bar': 'baz'}
     True
     """
-    new_mapping = _prefix_keys(mapping, prefix)
-    nested_mappings = _nested_mappings(mapping)
-    for key, mapping in nested_mappings:
-        new_items = _flatten_mapping(
-            mapping=mapping,
-            separator=separator,
-            prefix=prefix + key + separator)
-        new_mapping.pop(key)
-        new_mapping.update(new_items)
+    new_mapping = {}
+    _flatten_into(new_mapping, mapping, separator, prefix)
     return new_mapping
 
 
-def _prefix_keys(mapping, prefix):
-    """Prepend a prefix to all keys in a mapping."""
-    return {prefix + key: value for key, value in mapping.items()}
+def _flatten_into(new_mapping, mapping, separator, prefix):
+    """Write the flattened items of mapping into new_mapping.
+
+    Items of nested mappings take precedence over colliding plain items.
+    """
+    nested_mappings = []
+    for key, value in mapping.items():
+        if isinstance(value, Mapping):
+            nested_mappings.append((key, value))
+        else:
+            new_mapping[prefix + key] = value
+    for key, value in nested_mappings:
+        _flatten_into(new_mapping, value, separator, prefix + key + separator)
+
+
+class FlatView(Mapping):
+
+    """Lazy flattened view of nested mappings.
+
+    Keys like foo_bar are resolved on demand by looking up foo and then bar,
+    instead of flattening every key up front, which is cheaper when only a
+    few keys are looked up, as when substituting a template.  Iterating over
+    the view flattens the mapping.
+
+    If flattened keys collide, e.g. foo_bar and foo: {bar: ...}, the value
+    from the nested mapping is used.
+
+    >>> view = FlatView({'foo': {'bar': 'baz'}, 'spam': 'eggs'})
+    >>> view['foo_bar'], view['spam']
+    ('baz', 'eggs')
+    >>> 'foo' in view
+    False
+    """
+
+    __slots__ = ('_mapping', '_separator')
+
+    def __init__(self, mapping, separator='_'):
+        self._mapping = mapping
+        self._separator = separator
+
+    def __repr__(self):
+        return '{cls}({mapping!r})'.format(
+            cls=type(self).__qualname__,
+            mapping=self._mapping)
+
+    def __getitem__(self, key):
+        mapping = self._mapping
+        separator = self._separator
+        index = key.find(separator)
+        while index >= 0:
+            value = mapping.get(key[:index])
+            if isinstance(value, Mapping):
+                try:
+                    return type(self)(value, separator)[
+                        key[index + len(separator):]]
+                except KeyError:
+                    pass
+            index = key.find(separator, index + 1)
+        value = mapping[key]
+        if isinstance(value, Mapping):
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        return iter(_flatten_mapping(self._mapping, self._separator))
+
+    def __len__(self):
+        return len(_flatten_mapping(self._mapping, self._separator))
 
 
 def _nested_mappings(mapping):
@@ -70,9 +275,26 @@ def _nested_mappings(mapping):
 
 class JinjaRenderer:
 
-    def __init__(self, env, default_template='base.html'):
+    """Render documents using Jinja.
+
+    Templates are resolved once per distinct name, and documents rendered
+    as templates are compiled once per distinct content, keeping at most
+    cache_size compiled documents.  To reuse compiled templates across
+    builds, create env with a bytecode cache, e.g.
+    jinja2.FileSystemBytecodeCache.
+
+    Resolved templates are kept until invalidate() is called, bypassing the
+    environment's auto_reload, so long running processes that watch for
+    changes should call invalidate() when template files change.
+    """
+
+    def __init__(self, env, default_template='base.html', cache_size=256):
         self._env = env
         self._default_template = default_template
+        self._templates = {}
+        self._fingerprints = {}
+        self._from_string = functools.lru_cache(maxsize=cache_size)(
+            env.from_string)
 
     def __repr__(self):
         return ('{cls}(env={env!r}, default_template={default_template!r})'
@@ -80,22 +302,73 @@ class JinjaRenderer:
                         env=self._env,
                         default_template=self._default_template))
 
+    def fingerprint(self, document):
+        """Return bytes identifying the inputs to rendering besides document.
+
+        This covers the source of the document's template and of the
+        templates it references.  See mir.frelia.rendercache.
+        """
+        name = self._get_template_name(document)
+        try:
+            return self._fingerprints[name]
+        except KeyError:
+            pass
+        env = self._env
+        sources = [name]
+        for dependency in sorted(depend.find_template_dependencies(
+                env, [name])):
+            source, filename, uptodate = env.loader.get_source(
+                env, dependency)
+            sources.extend((dependency, source))
+        value = rendercache.fingerprint(sources)
+        self._fingerprints[name] = value
+        return value
+
+    def precompile(self, names=None):
+        """Compile templates up front.
+
+        names is an iterable of template names, defaulting to all of the
+        templates in the environment.
+        """
+        if names is None:
+            names = self._env.list_templates()
+        get_template = self._env.get_template
+        templates = self._templates
+        for name in names:
+            templates[name] = get_template(name)
+
+    def invalidate(self):
+        """Forget resolved templates and fingerprints.
+
+        Templates are resolved from the environment again on next use, so
+        changes to template files are picked up.
+        """
+        self._templates.clear()
+        self._fingerprints.clear()
+
     def render_as_template(self, document):
         """Render a document as a Jinja template.
 
         This allows the use of Jinja macros in the document.  Compare with
         render().
 
-        This is extremely slow.
+        This is extremely slow, although documents with the same content are
+        only compiled once.
         """
         logger.debug('Rendering %r as template with %r.', document, self)
-        document_as_template = self.env.from_string(document.content)
+        document_as_template = self._from_string(document.content)
         context = self._get_context(document)
         return document_as_template.render(context)
 
-    def render(self, document):
-        """Render a document using Jinja."""
+    def render(self, document, used_templates=None):
+        """Render a document using Jinja.
+
+        If used_templates is a set, the name of the template used is added to
+        it, for dependency tracking.
+        """
         logger.debug('Rendering %r with %r.', document, self)
+        if used_templates is not None:
+            used_templates.add(self._get_template_name(document))
         template = self._get_template(document)
         context = self._get_context_with_content(document)
         return template.render(context)
@@ -112,8 +385,13 @@ class JinjaRenderer:
 
     def _get_template(self, document):
         """Get the Jinja template for the document."""
-        template_name = document.template
-        return self._env.get_template(template_name)
+        template_name = self._get_template_name(document)
+        try:
+            return self._templates[template_name]
+        except KeyError:
+            template = self._env.get_template(template_name)
+            self._templates[template_name] = template
+            return template
 
     def _get_template_name(self, document):
         try:
@@ -122,31 +400,245 @@ class JinjaRenderer:
             return self._default_template
 
 
+class ParallelJinjaRenderer:
+
+    """Render documents using Jinja across a process pool.
+
+    Each worker process creates its own JinjaRenderer by calling
+    make_renderer, which must be picklable, such as a module level function.
+    Workers can share compiled templates by creating their environments
+    with the same jinja2.FileSystemBytecodeCache.
+    """
+
+    def __init__(self, make_renderer, processes=None, chunksize=16):
+        self._make_renderer = make_renderer
+        self._processes = processes
+        self._chunksize = chunksize
+
+    def __repr__(self):
+        return ('{cls}(make_renderer={make_renderer!r},'
+                ' processes={processes!r}, chunksize={chunksize!r})'
+                .format(cls=type(self).__qualname__,
+                        make_renderer=self._make_renderer,
+                        processes=self._processes,
+                        chunksize=self._chunksize))
+
+    def render_all(self, documents, output_path=None):
+        """Render documents, yielding the results in order.
+
+        This is equivalent to map(renderer.render, documents).  Documents are
+        sent to workers in chunks, so they must be picklable.
+
+        If output_path is given, it must be a picklable callable that returns
+        the output file path for a document.  Workers then write the rendered
+        text to that path and the paths are yielded instead, to avoid sending
+        rendered text back to this process.
+        """
+        with multiprocessing.Pool(self._processes,
+                                  initializer=_init_jinja_worker,
+                                  initargs=(self._make_renderer,)) as pool:
+            yield from pool.imap(
+                functools.partial(_render_in_worker, output_path=output_path),
+                documents,
+                self._chunksize)
+
+
+_worker_renderer = None
+
+
+def _init_jinja_worker(make_renderer):
+    global _worker_renderer
+    _worker_renderer = make_renderer()
+
+
+def _render_in_worker(document, output_path):
+    text = _worker_renderer.render(document)
+    if output_path is None:
+        return text
+    path = output_path(document)
+    fslib.make_parents(path)
+    with open(path, 'w') as file:
+        file.write(text)
+    return path
+
+
 def parse_date_from_path(path):
     """Parse a date using the final filenames in a path."""
     path = pathlib.Path(path)
-    for year, month, day in _iter_candidate_parts(path):
-        try:
-            return datetime.date(int(year), int(month), int(day))
-        except ValueError:
-            continue
-    else:
+    date = _date_from_parts(path.parts)
+    if date is None:
         raise ValueError("%r doesn't contain date" % path)
+    return date
 
 
-def _iter_candidate_parts(path):
-    """Generate candidate date parts from path.
+def parse_dates_from_paths(paths):
+    """Parse dates using the final filenames in paths.
+
+    This is a batch version of parse_date_from_path() that yields None
+    instead of raising for paths that don't contain a date.  Paths in the
+    same directory are only parsed once, unless their filename could be part
+    of a date.
+
+    >>> list(parse_dates_from_paths(['blog/2016/01/02/post', 'blog/post']))
+    [datetime.date(2016, 1, 2), None]
+    """
+    cache = {}
+    split = os.path.split
+    from_parts = _date_from_parts
+    Path = pathlib.Path
+    for path in paths:
+        dirname, filename = split(path)
+        if not filename or filename.isdecimal():
+            yield from_parts(Path(path).parts)
+            continue
+        try:
+            yield cache[dirname]
+        except KeyError:
+            date = cache[dirname] = from_parts(Path(dirname).parts)
+            yield date
+
+
+def _date_from_parts(parts):
+    """Return the date in the final path parts, or None.
+
+    >>> _date_from_parts(('blog', '2016', '02', '30', '2016', '02', '29'))
+    datetime.date(2016, 2, 29)
+    >>> _date_from_parts(('blog', '2016', '02', '30')) is None
+    True
+    """
+    for year, month, day in _iter_candidate_parts_from(parts):
+        date = _make_date(year, month, day)
+        if date is not None:
+            return date
+    return None
+
+
+def _make_date(year, month, day):
+    """Make a date from strings, or return None if they aren't a date."""
+    if not (year.isdecimal() and month.isdecimal() and day.isdecimal()):
+        return None
+    year, month, day = int(year), int(month), int(day)
+    if (datetime.MINYEAR <= year <= datetime.MAXYEAR
+            and 1 <= month <= 12
+            and 1 <= day <= calendar.monthrange(year, month)[1]):
+        return datetime.date(year, month, day)
+    return None
+
+
+def _iter_candidate_parts_from(parts):
+    """Generate candidate date parts from path parts.
 
             blog/2016/01/02/posts
     yields:           y   m   d
     yields:       y   m   d
     yields:  y    m   d
     """
-    path = pathlib.Path(path)
-    if len(path.parts) < 3:
+    if len(parts) < 3:
         return
-    reversed_parts = reversed(path.parts)
+    reversed_parts = parts[::-1]
     yield from zip(
         reversed_parts[2:],
         reversed_parts[1:],
         reversed_parts)
+
+
+def render_pages(pages, base_mapping):
+    """Render pages using Python templates.
+
+    Yield pairs of pages and their rendered text.
+    """
+    render = TemplateRenderer(base_mapping).render
+    for page in pages:
+        yield page, render(page)
+
+
+def render_pages_with_jinja(pages, renderer):
+    """Render pages using a JinjaRenderer.
+
+    Yield pairs of pages and their rendered text.
+    """
+    render = renderer.render
+    for page in pages:
+        yield page, render(page)
+
+
+def set_dates_from_paths(pages, attribute='date'):
+    """Set an attribute on pages to the date parsed from their paths.
+
+    Raise ValueError for pages whose paths don't contain a date.
+    """
+    pages, path_pages = itertools.tee(pages)
+    dates = parse_dates_from_paths(str(page.path) for page in path_pages)
+    set_attribute = setattr
+    for page, date in zip(pages, dates):
+        if date is None:
+            raise ValueError("%r doesn't contain date" % page.path)
+        set_attribute(page, attribute, date)
+        yield page
+
+
+def enrich(pages, function):
+    """Call a function on each page to add metadata to it in place."""
+    for page in pages:
+        function(page)
+        yield page
+
+
+class Pipeline:
+
+    """Chain of transmutations.
+
+    Each stage is a callable that accepts an iterable and returns an iterable,
+    such as a transmutation with its other arguments bound using
+    functools.partial().
+
+    >>> pipeline = Pipeline(
+    ...     functools.partial(map, str.upper),
+    ...     functools.partial(filter, str.isalpha))
+    >>> list(pipeline(['sophie', 'plachta', '42']))
+    ['SOPHIE', 'PLACHTA']
+    """
+
+    def __init__(self, *stages):
+        self._stages = stages
+
+    def __repr__(self):
+        return '{cls}{stages!r}'.format(
+            cls=type(self).__qualname__,
+            stages=self._stages)
+
+    def __call__(self, items):
+        """Lazily run items through the stages in this process."""
+        for stage in self._stages:
+            items = stage(items)
+        return items
+
+    def run_parallel(self, items, processes=None, chunksize=64):
+        """Run items through the stages across a process pool.
+
+        Items are sent to worker processes in chunks of chunksize, and each
+        worker runs a whole chunk through every stage.  Results are yielded
+        in order.  The stages, items and results must be picklable.
+        """
+        with multiprocessing.Pool(processes) as pool:
+            for results in pool.imap(self._run_chunk,
+                                     _chunks(items, chunksize)):
+                yield from results
+
+    def _run_chunk(self, chunk):
+        return list(self(chunk))
+
+
+def _chunks(iterable, size):
+    """Split an iterable into lists of the given size.
+
+    >>> list(_chunks(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+    """
+    iterator = iter(iterable)
+    islice = itertools.islice
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -12,6 +12,7 @@ Category -- Category metadata element
 https://tools.ietf.org/html/rfc4287
 """
 
+import collections
 import datetime
 import functools
 import io
@@ -21,6 +22,15 @@ import xml.etree.ElementTree as ET
 
 class Feed:
 
+    """Atom feed.
+
+    entries may be replaced with any iterable of entries, such as a generator.
+    write() serializes each entry as it is taken from the iterable, so the
+    feed never needs to hold all of its entries at once.
+    """
+
+    __slots__ = ('id', 'title', 'updated', 'rights', 'categories', 'entries')
+
     def __init__(self, id, title, updated: datetime.date):
         self.id = id
         self.title = title
@@ -42,13 +52,122 @@ class Feed:
         return element
 
     def write(self, file: io.TextIOBase):
-        """Write XML document to file."""
-        document = ET.ElementTree(self.to_etree())
-        document.write(file, encoding='unicode', xml_declaration=True)
+        """Write XML document to file.
+
+        The output is the same as serializing to_etree(), but each child
+        element is written as soon as it is created.
+        """
+        self._write(file, (_tostring(entry) for entry in self.entries))
+
+    def _write(self, file, entry_strings):
+        """Write XML document to file using serialized entries."""
+        file.write(_xml_declaration(file))
+        file.write(_FEED_START)
+        write = file.write
+        for element in (_ID(self.id), _Title(self.title),
+                        _Updated(self.updated)):
+            write(ET.tostring(element, encoding='unicode'))
+        for category in self.categories:
+            write(_tostring(category))
+        for text in entry_strings:
+            write(text)
+        file.write(_FEED_END)
+
+
+class FeedBuilder:
+
+    """Build many feeds in one pass over a stream of entries.
+
+    routers is a sequence of callables that take the index and an entry from
+    the stream and return an iterable of keys of the feeds the entry belongs
+    to; see route_all(), route_by_category(), route_by_author() and
+    paginate().  feed_factory is called with a key to create the Feed for
+    that key, whose entries are ignored.
+
+    Each entry is serialized once, and the serialized text is shared by
+    every feed the entry belongs to.
+    """
+
+    def __init__(self, feed_factory, routers):
+        self._feed_factory = feed_factory
+        self._routers = routers
+        self._entry_strings = collections.OrderedDict()
+        self._count = 0
+
+    def __repr__(self):
+        return ('{cls}(feed_factory={feed_factory!r}, routers={routers!r})'
+                .format(cls=type(self).__qualname__,
+                        feed_factory=self._feed_factory,
+                        routers=self._routers))
+
+    def add_entries(self, entries):
+        """Route a stream of entries to their feeds.
+
+        Entries are indexed continuing from previous calls.
+        """
+        routers = self._routers
+        entry_strings = self._entry_strings
+        index = self._count - 1
+        for index, entry in enumerate(entries, self._count):
+            text = _tostring(entry)
+            for route in routers:
+                for key in route(index, entry):
+                    try:
+                        entry_strings[key].append(text)
+                    except KeyError:
+                        entry_strings[key] = [text]
+        self._count = index + 1
+
+    def keys(self):
+        """Return the keys of the feeds that have entries."""
+        return list(self._entry_strings)
+
+    def write(self, key, file: io.TextIOBase):
+        """Write the feed for a key to a file."""
+        feed = self._feed_factory(key)
+        feed._write(file, self._entry_strings[key])
+
+    def write_all(self, open_file):
+        """Write every feed.
+
+        open_file is called with each key and must return a text file opened
+        for writing, which is closed afterward.
+        """
+        for key in self._entry_strings:
+            with open_file(key) as file:
+                self.write(key, file)
+
+
+def route_all(index, entry):
+    """Route every entry to the main feed, whose key is None."""
+    return (None,)
+
+
+def route_by_category(index, entry):
+    """Route entries to feeds keyed by ('category', term)."""
+    return [('category', category.term) for category in entry.categories]
+
+
+def route_by_author(index, entry):
+    """Route entries to feeds keyed by ('author', name)."""
+    return [('author', author.name) for author in entry.authors]
+
+
+def paginate(size):
+    """Return a router for archive pages of size entries.
+
+    Entries are routed to feeds keyed by ('page', number), numbered from 0.
+    """
+    def route_by_page(index, entry):
+        return (('page', index // size),)
+    return route_by_page
 
 
 class Entry:
 
+    __slots__ = ('id', 'title', 'updated', 'published', 'summary', 'links',
+                 'authors', 'categories', 'entries')
+
     def __init__(self, id, title, updated: datetime.date):
         self.id = id
         self.title = title
@@ -79,6 +198,8 @@ class Entry:
 
 class _Person:
 
+    __slots__ = ('name', 'uri', 'email')
+
     def __init__(self, name):
         self.name = name
         self.uri = ''
@@ -95,11 +216,14 @@ class _Person:
 
 
 class Author(_Person):
+    __slots__ = ()
     _TAG = 'author'
 
 
 class Link:
 
+    __slots__ = ('href', 'rel', 'type')
+
     def __init__(self, href):
         self.href = href
         self.rel = ''
@@ -117,6 +241,8 @@ class Link:
 
 class Category:
 
+    __slots__ = ('term', 'scheme', 'label')
+
     def __init__(self, term):
         self.term = term
         self.scheme = ''
@@ -146,6 +272,20 @@ def _DateElement(tag, date: datetime.date):
     return element
 
 
+_FEED_START = '<feed xmlns="http://www.w3.org/2005/Atom">'
+_FEED_END = '</feed>'
+
+
+def _xml_declaration(file):
+    """Return an XML declaration of the encoding of a text file."""
+    encoding = getattr(file, 'encoding', None) or 'UTF-8'
+    return "<?xml version='1.0' encoding='{}'?>\n".format(encoding)
+
+
+def _tostring(item):
+    return ET.tostring(item.to_etree(), encoding='unicode')
+
+
 _ID = functools.partial(_TextElement, 'id')
 _Title = functools.partial(_TextElement, 'title')
 _Rights = functools.partial(_TextElement, 'rights')
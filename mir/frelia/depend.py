@@ -0,0 +1,110 @@
+"""Render dependency tracking.
+
+A dependency graph records which templates and base mapping names each
+output used when it was rendered, so that after a template or the base
+mapping changes, only the outputs that used them need to be rendered again:
+
+    graph = DependencyGraph.load('deps')
+    names, templates = set(), set()
+    text = template_renderer.render(page, used_names=names)
+    html = jinja_renderer.render(page, used_templates=templates)
+    graph.record(output_path, names=names,
+                 templates=find_template_dependencies(env, templates))
+    graph.save('deps')
+
+    graph.stale(templates=['base.html'], keys=['site'])
+"""
+
+import mir.frelia.manifest as manifestlib
+
+
+class DependencyGraph:
+
+    """Mapping of outputs to the templates and names used to render them."""
+
+    def __init__(self, dependencies=None):
+        self._dependencies = {} if dependencies is None else dependencies
+
+    def __repr__(self):
+        return '<{cls} with {count} outputs>'.format(
+            cls=type(self).__qualname__,
+            count=len(self._dependencies))
+
+    def __len__(self):
+        return len(self._dependencies)
+
+    def __contains__(self, output):
+        return output in self._dependencies
+
+    def record(self, output, templates=(), names=()):
+        """Record the dependencies of an output, replacing previous ones.
+
+        templates are the names of templates used, including included and
+        extended templates.  names are the flattened base mapping names that
+        were looked up.
+        """
+        self._dependencies[output] = (frozenset(templates), frozenset(names))
+
+    def discard(self, output):
+        self._dependencies.pop(output, None)
+
+    def dependencies(self, output):
+        """Return the templates and names recorded for an output."""
+        return self._dependencies[output]
+
+    def stale(self, templates=(), keys=(), separator='_'):
+        """Return the set of outputs affected by changed inputs.
+
+        templates are the names of changed templates.  keys are changed top
+        level keys of the base mapping; an output is affected if it looked up
+        a key or a name flattened from it, such as site_title for site.
+        """
+        templates = frozenset(templates)
+        prefixes = tuple(key + separator for key in keys)
+        keys = frozenset(keys)
+        stale = set()
+        for output, (used_templates, used_names) in (
+                self._dependencies.items()):
+            if not templates.isdisjoint(used_templates):
+                stale.add(output)
+            elif not keys.isdisjoint(used_names) or any(
+                    name.startswith(prefixes) for name in used_names):
+                stale.add(output)
+        return stale
+
+    @classmethod
+    def load(cls, filepath):
+        """Load a graph from a file.
+
+        Return an empty graph if the file does not exist.
+        """
+        return cls(manifestlib.load_state(filepath, {}))
+
+    def save(self, filepath):
+        """Save the graph to a file atomically."""
+        manifestlib.save_state(filepath, self._dependencies)
+
+
+def find_template_dependencies(env, names):
+    """Return the names of templates and everything they reference.
+
+    env is a Jinja environment.  References are found statically, so
+    templates referenced by names computed at render time are not found.
+    """
+    # jinja2 is not a runtime dependency of this package.
+    import jinja2.meta
+
+    found = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name in found:
+            continue
+        found.add(name)
+        source, filename, uptodate = env.loader.get_source(env, name)
+        ast = env.parse(source, name, filename)
+        pending.extend(
+            referenced
+            for referenced in jinja2.meta.find_referenced_templates(ast)
+            if referenced is not None)
+    return found
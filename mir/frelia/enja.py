@@ -12,9 +12,14 @@ An Enja file is a text file that contains:
 """
 
 import io
+import locale
+import os
+import re
 
 import yaml
 
+import mir.frelia.manifest as manifestlib
+
 
 class Document:
 
@@ -38,6 +43,85 @@ class Document:
             return NotImplemented
 
 
+class LazyDocument:
+
+    """Enja document loaded from a file on demand.
+
+    The header is parsed when it is first accessed.  The body is read when it
+    is first accessed, starting at the body offset found while reading the
+    header, so passes that only need headers never read body text.
+    """
+
+    __slots__ = ('path', '_header', '_body', '_body_offset')
+
+    def __init__(self, path):
+        self.path = path
+        self._header = None
+        self._body = None
+        self._body_offset = None
+
+    def __repr__(self):
+        return '<{cls} with path={path!r}>'.format(
+            cls=type(self).__qualname__,
+            path=self.path,
+        )
+
+    def __eq__(self, other):
+        if isinstance(other, (type(self), Document)):
+            return (self.header == other.header and self.body == other.body)
+        else:
+            return NotImplemented
+
+    @property
+    def header(self):
+        if self._header is None:
+            self._read_header()
+        return self._header
+
+    @header.setter
+    def header(self, value):
+        self._header = value
+
+    @property
+    def body(self):
+        if self._body is None:
+            with open(self.path, 'rb') as file:
+                file.seek(self.body_offset)
+                self._body = _decode(file.read())
+        return self._body
+
+    @body.setter
+    def body(self, value):
+        self._body = value
+
+    @property
+    def body_offset(self):
+        """Byte offset of the body in the file."""
+        if self._body_offset is None:
+            self._read_header()
+        return self._body_offset
+
+    def _read_header(self):
+        # Binary lines split only on LF, so search each line for the divider
+        # the same way as body_offset() to handle other newline endings.
+        search = _DIVIDER_PATTERN.search
+        header_lines = []
+        offset = 0
+        with open(self.path, 'rb') as file:
+            for line in file:
+                match = search(line)
+                if match is not None:
+                    header_lines.append(line[:match.start()])
+                    offset += match.end()
+                    break
+                header_lines.append(line)
+                offset += len(line)
+        header = _load_header(_decode(b''.join(header_lines)))
+        if self._header is None:
+            self._header = header
+        self._body_offset = offset
+
+
 def dump(document, file):
     """Write a document to an enja file."""
     yaml.dump(
@@ -54,7 +138,13 @@ class Loader:
         self._document_class = document_class
 
     def __call__(self, file):
-        """Load a document from an Enja file."""
+        """Load a document from an Enja file.
+
+        file may be a text file or a binary file.  Binary files are read with
+        load_bytes(), which is faster than reading a text file line by line.
+        """
+        if isinstance(file, (io.BufferedIOBase, io.RawIOBase)):
+            return self.load_bytes(file.read())
         header_stream, file = _create_header_stream(file)
         header = _load_header(header_stream)
         body = file.read()
@@ -62,11 +152,112 @@ class Loader:
         document.header = header
         return document
 
+    def load_bytes(self, data: bytes):
+        """Load a document from the contents of an Enja file.
+
+        The divider is found with a single search and the header and body are
+        decoded from slices of the same buffer.  The result is the same as
+        loading the file opened in text mode.
+        """
+        if b'\r' in data:
+            # Let TextIOWrapper handle universal newlines.
+            return self(io.TextIOWrapper(io.BytesIO(data)))
+        header_end, body_start = _find_divider(data)
+        view = memoryview(data)
+        encoding = locale.getpreferredencoding(False)
+        header = _load_header(str(view[:header_end], encoding))
+        document = self._document_class(str(view[body_start:], encoding))
+        document.header = header
+        return document
+
 
 load = Loader(Document)
 
 
+class CachingLoader:
+
+    """Enja loader that uses headers cached in a manifest.
+
+    When loading a binary file whose modification time and size match its
+    entry in the manifest, or whose content hash matches if those differ, the
+    cached header is used and only the body is decoded.  Otherwise the file
+    is parsed.  The file's entry is updated either way.  Text files and files
+    without a path name are always parsed.
+
+    Cached headers are shared between loads and should not be mutated.
+    """
+
+    def __init__(self, document_class, manifest):
+        self._document_class = document_class
+        self._loader = Loader(document_class)
+        self._manifest = manifest
+
+    def __call__(self, file):
+        """Load a document from an Enja file."""
+        name = getattr(file, 'name', None)
+        if (not isinstance(file, (io.BufferedIOBase, io.RawIOBase))
+                or not isinstance(name, str)):
+            return self._loader(file)
+        document, changed = self.load_file(file, name)
+        return document
+
+    def load_file(self, file, path):
+        """Load a document from a binary file using the entry for path.
+
+        Return the document and whether the file was parsed because it has
+        no entry or its content changed.
+        """
+        stat = os.fstat(file.fileno())
+        manifest = self._manifest
+        entry = manifest.get(path)
+        if manifestlib.is_fresh(entry, stat):
+            file.seek(entry.body_offset)
+            return self._cached_document(entry, file.read()), False
+        data = file.read()
+        digest = manifestlib.digest(data)
+        changed = entry is None or entry.digest != digest
+        if changed:
+            document = self._loader.load_bytes(data)
+        else:
+            document = self._cached_document(
+                entry, data[entry.body_offset:])
+        manifest.set(path, manifestlib.Entry(
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            digest=digest,
+            header=document.header,
+            body_offset=body_offset(data)))
+        return document, changed
+
+    def _cached_document(self, entry, body: bytes):
+        document = self._document_class(_decode(body))
+        document.header = entry.header
+        return document
+
+
+def build_header_cache(paths, manifest):
+    """Parse the headers of Enja files into a manifest.
+
+    Files whose entries in the manifest are fresh are not parsed again.  Save
+    the manifest afterward so later builds can use it with CachingLoader.
+    """
+    loader = CachingLoader(Document, manifest)
+    for path in paths:
+        with open(path, 'rb') as file:
+            loader(file)
+
+
+def load_lazily(path):
+    """Load a document from an Enja file on demand.
+
+    See LazyDocument.
+    """
+    return LazyDocument(path)
+
+
 _DIVIDER = '---\n'
+# The divider line with any of the newlines recognized by universal newlines.
+_DIVIDER_PATTERN = re.compile(rb'(?:^|(?<=[\r\n]))---(?:\r\n|\r|\n)')
 
 
 def _create_header_stream(file):
@@ -87,6 +278,37 @@ def _create_header_stream(file):
     return header_stream, file
 
 
+def body_offset(data: bytes):
+    """Return the byte offset of the document body in Enja file data."""
+    header_end, body_start = _find_divider(data)
+    return body_start
+
+
+def _find_divider(data: bytes):
+    """Find the divider in Enja file data.
+
+    Return the byte offsets of the end of the header and the start of the
+    body.  Lines may end with any of the newlines recognized by universal
+    newlines mode, as when the file is read in text mode.
+
+    >>> _find_divider(b'foo: bar\\n---\\nbaz')
+    (9, 13)
+    >>> _find_divider(b'foo: bar\\r\\n---\\r\\nbaz')
+    (10, 15)
+    >>> _find_divider(b'foo: bar\\n')
+    (9, 9)
+    """
+    match = _DIVIDER_PATTERN.search(data)
+    if match is None:
+        return len(data), len(data)
+    return match.start(), match.end()
+
+
+def _decode(data: bytes):
+    """Decode file data the same way as reading a file opened with open()."""
+    return io.TextIOWrapper(io.BytesIO(data)).read()
+
+
 def _load_header(stream):
     header = yaml.load(stream, Loader=yaml.CLoader)
     if header is None:
@@ -1,25 +1,341 @@
 """File system utilities."""
 
+import collections
+import concurrent.futures
+import errno
+import fnmatch
+import itertools
 import os
 import pathlib
+import re
+import shutil
+import threading
+import time
 
+import mir.frelia.manifest as manifestlib
 
-def find_files(path):
-    """Yield the paths of all files in a directory tree."""
-    for dirpath, dirnames, filenames in os.walk(path):
-        dirpath = pathlib.Path(dirpath)
-        for filename in filenames:
-            yield dirpath / filename
 
+def find_files(path, include=(), exclude=(), prune=()):
+    """Yield the paths of all files in a directory tree.
 
-def link_recursively(src_dir, dst_dir):
-    """Hard link files recursively from src to dst."""
-    dst_dir = pathlib.Path(dst_dir)
-    for filepath in find_files(src_dir):
-        rel_filepath = filepath.relative_to(src_dir)
-        dst_filepath = dst_dir / rel_filepath
-        make_parents(dst_filepath)
-        os.link(filepath, dst_filepath)
+    See scan_files() for the filtering arguments.
+    """
+    return scan_files(path, include=include, exclude=exclude, prune=prune)
+
+
+def scan_files(path, include=(), exclude=(), prune=(),
+               with_stat=False, as_str=False):
+    """Yield the files in a directory tree using os.scandir().
+
+    include and exclude are sequences of glob patterns matched against file
+    names.  A file is yielded if it matches any include pattern, or include is
+    empty, and matches no exclude pattern.  prune is a sequence of glob
+    patterns matched against directory names; matching directories are not
+    descended into.  Symbolic links to directories are not descended into.
+    Directories that cannot be listed, including a missing path, are skipped.
+
+    If with_stat is true, yield pairs of paths and the stat results cached by
+    os.scandir() instead of paths.  If as_str is true, yield paths as strings
+    instead of pathlib.Path instances.
+    """
+    include = _compile_patterns(include)
+    exclude = _compile_patterns(exclude)
+    prune = _compile_patterns(prune)
+    for entry in _scan_entries(os.fspath(path), prune):
+        name = entry.name
+        if include is not None and not include(name):
+            continue
+        if exclude is not None and exclude(name):
+            continue
+        filepath = entry.path if as_str else pathlib.Path(entry.path)
+        if with_stat:
+            yield filepath, entry.stat()
+        else:
+            yield filepath
+
+
+PRUNE_HIDDEN = ('.*',)
+PRUNE_VCS = ('.git', '.hg', '.svn', '.bzr', 'CVS')
+
+
+def _scan_entries(dirpath, prune):
+    """Yield os.DirEntry instances for the files in a directory tree.
+
+    Directories that cannot be listed are skipped, as with os.walk().
+    """
+    try:
+        entries = os.scandir(dirpath)
+    except OSError:
+        return
+    subdirs = []
+    with entries:
+        for entry in entries:
+            if not entry.is_dir():
+                yield entry
+            elif entry.is_symlink():
+                continue
+            elif prune is None or not prune(entry.name):
+                subdirs.append(entry.path)
+    for subdir in subdirs:
+        yield from _scan_entries(subdir, prune)
+
+
+def _compile_patterns(patterns):
+    """Compile glob patterns into a single match function.
+
+    Return None if there are no patterns.
+
+    >>> match = _compile_patterns(['*.html', '*.xml'])
+    >>> bool(match('index.html')), bool(match('style.css'))
+    (True, False)
+    """
+    if not patterns:
+        return None
+    regex = '|'.join(fnmatch.translate(pattern) for pattern in patterns)
+    return re.compile(regex).match
+
+
+def link_recursively(src_dir, dst_dir, max_workers=None, sync=False,
+                     max_pending=64):
+    """Hard link files recursively from src to dst.
+
+    Each destination directory is created once, and the files in each
+    directory are linked as a batch on a thread pool of max_workers threads,
+    with at most max_pending batches queued at a time.  Files that cannot be
+    hard linked because src and dst are on different file systems are copied
+    instead.
+
+    If sync is true, existing destination files are skipped if they are the
+    same file as the source or have the same size and modification time, and
+    are replaced otherwise.  If sync is false, existing destination files
+    raise FileExistsError.
+
+    Return a LinkStats instance.
+    """
+    stats = LinkStats()
+    start = time.perf_counter()
+    calls = _link_calls(src_dir, dst_dir, sync, stats)
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        for linked, copied, skipped in _bounded_map(
+                executor, calls, max_pending):
+            stats.linked += linked
+            stats.copied += copied
+            stats.skipped += skipped
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+class LinkStats:
+
+    """Counts and timing for link_recursively()."""
+
+    __slots__ = ('directories', 'linked', 'copied', 'skipped', 'seconds')
+
+    def __init__(self):
+        self.directories = 0
+        self.linked = 0
+        self.copied = 0
+        self.skipped = 0
+        self.seconds = 0.0
+
+    def __repr__(self):
+        return ('<{cls} with directories={this.directories!r},'
+                ' linked={this.linked!r}, copied={this.copied!r},'
+                ' skipped={this.skipped!r}, seconds={this.seconds!r}>'
+                .format(cls=type(self).__qualname__, this=self))
+
+
+def _link_calls(src_dir, dst_dir, sync, stats):
+    """Yield _link_files() calls for link_recursively().
+
+    Destination directories are created as they are reached.
+    """
+    for rel_dirpath, filenames in _walk_files(os.fspath(src_dir)):
+        src_dirpath = os.path.join(src_dir, rel_dirpath)
+        dst_dirpath = os.path.join(dst_dir, rel_dirpath)
+        os.makedirs(dst_dirpath, exist_ok=True)
+        stats.directories += 1
+        yield _link_files, src_dirpath, dst_dirpath, filenames, sync
+
+
+def _walk_files(top):
+    """Yield relative directory paths and the names of files in them.
+
+    Only directories containing files are yielded.  Symbolic links to
+    directories are not descended into.
+    """
+    # _scan_entries() yields the files of each directory consecutively.
+    entries = _scan_entries(top, None)
+    for dirpath, group in itertools.groupby(
+            entries, lambda entry: os.path.dirname(entry.path)):
+        yield os.path.relpath(dirpath, top), [entry.name for entry in group]
+
+
+def _link_files(src_dirpath, dst_dirpath, filenames, sync):
+    """Link files from one directory to another.
+
+    Return counts of files linked, copied and skipped.
+    """
+    linked = copied = skipped = 0
+    join = os.path.join
+    for filename in filenames:
+        src = join(src_dirpath, filename)
+        dst = join(dst_dirpath, filename)
+        if sync:
+            if _is_synced(src, dst):
+                skipped += 1
+                continue
+        try:
+            os.link(src, dst)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.copy2(src, dst)
+            copied += 1
+        else:
+            linked += 1
+    return linked, copied, skipped
+
+
+def _is_synced(src, dst):
+    """Return True if dst is up to date with src.
+
+    If dst exists but is not up to date, it is removed.
+    """
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return False
+    src_stat = os.stat(src)
+    if (os.path.samestat(src_stat, dst_stat)
+            or (src_stat.st_size == dst_stat.st_size
+                and src_stat.st_mtime_ns == dst_stat.st_mtime_ns)):
+        return True
+    os.unlink(dst)
+    return False
+
+
+def write_outputs(output_dir, outputs, manifest, max_workers=None,
+                  max_pending=64):
+    """Write output files, skipping files whose content has not changed.
+
+    outputs is an iterable of pairs of paths relative to output_dir and the
+    content to write to them, as str or bytes.  Strings are encoded as UTF-8.
+
+    manifest is a mir.frelia.manifest.Manifest recording the content hashes of
+    previously written files, which is updated in place.  A file is skipped if
+    its recorded hash matches and it has not been touched since, or if it has
+    no record but its existing content has the same hash.  Changed files are
+    written atomically by writing to a temporary file and renaming it.
+
+    Each output directory is created once, and files are written on a thread
+    pool of max_workers threads.  outputs is consumed as writes complete,
+    with at most max_pending writes queued at a time, so the content of the
+    whole site is never held in memory.  Return a WriteStats instance.
+    """
+    stats = WriteStats()
+    start = time.perf_counter()
+    calls = _write_calls(output_dir, outputs, manifest)
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        for written in _bounded_map(executor, calls, max_pending):
+            if written:
+                stats.written += 1
+            else:
+                stats.skipped += 1
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+class WriteStats:
+
+    """Counts and timing for write_outputs()."""
+
+    __slots__ = ('written', 'skipped', 'seconds')
+
+    def __init__(self):
+        self.written = 0
+        self.skipped = 0
+        self.seconds = 0.0
+
+    def __repr__(self):
+        return ('<{cls} with written={this.written!r},'
+                ' skipped={this.skipped!r}, seconds={this.seconds!r}>'
+                .format(cls=type(self).__qualname__, this=self))
+
+
+def _write_calls(output_dir, outputs, manifest):
+    """Yield _write_output() calls for write_outputs().
+
+    Each output directory is created once, as it is reached.
+    """
+    created_dirs = set()
+    for rel_path, content in outputs:
+        path = os.path.join(output_dir, rel_path)
+        dirpath = os.path.dirname(path)
+        if dirpath not in created_dirs:
+            os.makedirs(dirpath, exist_ok=True)
+            created_dirs.add(dirpath)
+        yield _write_output, manifest, str(rel_path), path, content
+
+
+def _write_output(manifest, key, path, content):
+    """Write an output file if its content changed.
+
+    Return True if the file was written.
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    digest = manifestlib.digest(content)
+    entry = manifest.get(key)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        stat = None
+    if stat is not None:
+        if entry is not None and entry.digest == digest:
+            unchanged = manifestlib.is_fresh(entry, stat)
+        else:
+            unchanged = (entry is None and stat.st_size == len(content)
+                         and _digest_file(path) == digest)
+        if unchanged:
+            if entry is None:
+                manifest.set(key, _output_entry(stat, digest))
+            return False
+    tmp_path = '{}.{}.tmp'.format(path, threading.get_ident())
+    with open(tmp_path, 'wb') as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+    manifest.set(key, _output_entry(os.stat(path), digest))
+    return True
+
+
+def _output_entry(stat, digest):
+    return manifestlib.Entry(
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        digest=digest,
+        header=None,
+        body_offset=None)
+
+
+def _digest_file(path):
+    with open(path, 'rb') as file:
+        return manifestlib.digest(file.read())
+
+
+def _bounded_map(executor, calls, max_pending):
+    """Run calls on an executor and yield their results in order.
+
+    calls is an iterable of tuples of a function and its arguments.  Calls
+    are only taken from it while fewer than max_pending are unfinished.
+    """
+    pending = collections.deque()
+    for function, *args in calls:
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+        pending.append(executor.submit(function, *args))
+    while pending:
+        yield pending.popleft().result()
 
 
 def make_parents(path):
@@ -0,0 +1,237 @@
+"""Site metadata index.
+
+MetadataIndex stores page paths and Enja headers in an SQLite database, so
+that listing pages such as tag pages and archives can be built from indexed
+queries instead of loading and scanning every page:
+
+    index = MetadataIndex('index.sqlite')
+    index.sync(manifest)
+    for result in index.query(tag='alchemy', limit=10):
+        ...
+
+The index recognizes these header fields:
+
+date -- date of the page, otherwise parsed from the page's path
+author -- author name, or a mapping with a name key
+tags -- list of tags, or a single tag
+
+Other top level scalar header fields can be queried by equality.
+"""
+
+import collections
+from collections.abc import Mapping
+import datetime
+import pickle
+import sqlite3
+
+import mir.frelia.alchemy as alchemy
+
+Result = collections.namedtuple('Result', 'path date header')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pages (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER,
+    date TEXT,
+    author TEXT,
+    header BLOB
+);
+CREATE INDEX IF NOT EXISTS pages_date ON pages (date);
+CREATE INDEX IF NOT EXISTS pages_author ON pages (author);
+CREATE TABLE IF NOT EXISTS tags (
+    path TEXT REFERENCES pages (path) ON DELETE CASCADE,
+    tag TEXT
+);
+CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag);
+CREATE INDEX IF NOT EXISTS tags_path ON tags (path);
+CREATE TABLE IF NOT EXISTS fields (
+    path TEXT REFERENCES pages (path) ON DELETE CASCADE,
+    key TEXT,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS fields_key_value ON fields (key, value);
+CREATE INDEX IF NOT EXISTS fields_path ON fields (path);
+'''
+
+_ORDER_COLUMNS = frozenset(('date', 'path', 'author'))
+
+
+class MetadataIndex:
+
+    """SQLite index of page headers.
+
+    database is a path to the database file, or ':memory:'.
+    """
+
+    def __init__(self, database=':memory:'):
+        self._database = database
+        self._connection = sqlite3.connect(str(database))
+        self._connection.execute('PRAGMA foreign_keys = ON')
+        self._connection.executescript(_SCHEMA)
+
+    def __repr__(self):
+        return '{cls}({database!r})'.format(
+            cls=type(self).__qualname__,
+            database=self._database)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def __len__(self):
+        return self._connection.execute(
+            'SELECT count(*) FROM pages').fetchone()[0]
+
+    def update(self, path, header, mtime_ns=None):
+        """Add or replace the header of a page."""
+        with self._connection:
+            self._update(str(path), header, mtime_ns)
+
+    def remove(self, path):
+        """Remove a page."""
+        with self._connection:
+            self._connection.execute(
+                'DELETE FROM pages WHERE path = ?', (str(path),))
+
+    def sync(self, manifest):
+        """Update the index from a mir.frelia.manifest.Manifest.
+
+        Pages whose modification time is unchanged since they were indexed
+        are skipped, and pages that are not in the manifest are removed.
+        Entries without a header, such as the output file entries recorded by
+        mir.frelia.fs.write_outputs(), are not pages and are ignored.  Return
+        the number of pages added or updated.
+        """
+        connection = self._connection
+        indexed = dict(connection.execute('SELECT path, mtime_ns FROM pages'))
+        updated = 0
+        with connection:
+            for path, entry in manifest.entries.items():
+                if entry.header is None:
+                    continue
+                if indexed.pop(path, None) != entry.mtime_ns:
+                    self._update(path, entry.header, entry.mtime_ns)
+                    updated += 1
+            connection.executemany(
+                'DELETE FROM pages WHERE path = ?',
+                ((path,) for path in indexed))
+        return updated
+
+    def _update(self, path, header, mtime_ns):
+        connection = self._connection
+        connection.execute('DELETE FROM pages WHERE path = ?', (path,))
+        connection.execute(
+            'INSERT INTO pages (path, mtime_ns, date, author, header)'
+            ' VALUES (?, ?, ?, ?, ?)',
+            (path, mtime_ns, _header_date(path, header),
+             _header_author(header),
+             pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL)))
+        connection.executemany(
+            'INSERT INTO tags (path, tag) VALUES (?, ?)',
+            ((path, str(tag)) for tag in _header_tags(header)))
+        connection.executemany(
+            'INSERT INTO fields (path, key, value) VALUES (?, ?, ?)',
+            ((path, key, _field_value(value))
+             for key, value in header.items()
+             if isinstance(value, _SCALAR_TYPES)))
+
+    def query(self, tag=None, author=None, start=None, end=None,
+              fields=None, order='date', descending=True,
+              limit=None, offset=0):
+        """Return a list of Result tuples for matching pages.
+
+        tag and author match pages with that tag or author.  start and end
+        are dates bounding the page date, inclusive.  fields is a mapping of
+        header fields to values to match.  Results are sorted by order, which
+        is one of date, path or author, and paginated with limit and offset.
+        """
+        if order not in _ORDER_COLUMNS:
+            raise ValueError('order must be one of: '
+                             + ', '.join(sorted(_ORDER_COLUMNS)))
+        clauses = []
+        params = []
+        if tag is not None:
+            clauses.append(
+                'path IN (SELECT path FROM tags WHERE tag = ?)')
+            params.append(str(tag))
+        if author is not None:
+            clauses.append('author = ?')
+            params.append(author)
+        if start is not None:
+            clauses.append('date >= ?')
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append('date <= ?')
+            params.append(end.isoformat())
+        for key, value in (fields or {}).items():
+            clauses.append(
+                'path IN (SELECT path FROM fields'
+                ' WHERE key = ? AND value = ?)')
+            params.extend((key, _field_value(value)))
+        sql = 'SELECT path, date, header FROM pages'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY {} {}, path'.format(
+            order, 'DESC' if descending else 'ASC')
+        if limit is not None or offset:
+            sql += ' LIMIT ? OFFSET ?'
+            params.extend((-1 if limit is None else limit, offset))
+        return [
+            Result(path,
+                   None if date is None else _parse_date(date),
+                   pickle.loads(header))
+            for path, date, header in self._connection.execute(sql, params)
+        ]
+
+    def tags(self):
+        """Return a list of (tag, count) pairs sorted by tag."""
+        return self._connection.execute(
+            'SELECT tag, count(*) FROM tags GROUP BY tag ORDER BY tag'
+        ).fetchall()
+
+
+_SCALAR_TYPES = (str, int, float, bool, datetime.date)
+
+
+def _field_value(value):
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value)
+
+
+def _header_date(path, header):
+    date = header.get('date')
+    if isinstance(date, datetime.datetime):
+        date = date.date()
+    if not isinstance(date, datetime.date):
+        date, = alchemy.parse_dates_from_paths([path])
+    if date is None:
+        return None
+    return date.isoformat()
+
+
+def _parse_date(text):
+    return datetime.datetime.strptime(text, '%Y-%m-%d').date()
+
+
+def _header_author(header):
+    author = header.get('author')
+    if isinstance(author, Mapping):
+        author = author.get('name')
+    if author is None:
+        return None
+    return str(author)
+
+
+def _header_tags(header):
+    tags = header.get('tags')
+    if tags is None:
+        return ()
+    if isinstance(tags, (str, int)):
+        return (tags,)
+    return tags
@@ -0,0 +1,172 @@
+"""Build instrumentation.
+
+Stats collects per-stage counts, timings, byte counts and the slowest items
+of a build.  Stages are instrumented by wrapping the functions and iterables
+that make up a build, so uninstrumented builds pay no cost:
+
+    stats = Stats()
+    pages = stats.timed_iter('load_pages', page.load_pages('content'))
+    render = stats.timed('render', renderer.render, output_bytes=True)
+    for page in pages:
+        render(page)
+    stats.report(sys.stderr)
+"""
+
+import collections
+import contextlib
+import functools
+import heapq
+import json
+import time
+
+
+class Stats:
+
+    """Per-stage build statistics.
+
+    slowest is the number of slowest items to keep for each stage.
+    """
+
+    def __init__(self, slowest=10):
+        self._slowest_count = slowest
+        self._stages = collections.OrderedDict()
+
+    def __repr__(self):
+        return '<{cls} with stages={stages!r}>'.format(
+            cls=type(self).__qualname__,
+            stages=list(self._stages))
+
+    def record(self, stage, seconds, label=None,
+               bytes_read=0, bytes_written=0):
+        """Record one item processed by a stage."""
+        try:
+            stage_stats = self._stages[stage]
+        except KeyError:
+            stage_stats = self._stages[stage] = _StageStats()
+        stage_stats.durations.append(seconds)
+        stage_stats.bytes_read += bytes_read
+        stage_stats.bytes_written += bytes_written
+        if label is not None:
+            item = (seconds, label)
+            slowest = stage_stats.slowest
+            if len(slowest) < self._slowest_count:
+                heapq.heappush(slowest, item)
+            elif slowest and seconds > slowest[0][0]:
+                heapq.heapreplace(slowest, item)
+
+    @contextlib.contextmanager
+    def measure(self, stage, label=None, bytes_read=0, bytes_written=0):
+        """Context manager that records the time spent in its block."""
+        start = time.perf_counter()
+        yield
+        self.record(stage, time.perf_counter() - start, label,
+                    bytes_read, bytes_written)
+
+    def timed(self, stage, function, output_bytes=False):
+        """Wrap a function to record each call as an item of a stage.
+
+        Items are labeled using the path attribute of the first argument, if
+        any.  If output_bytes is true, the size of str or bytes results is
+        recorded as bytes written, counting str results encoded as UTF-8.
+        """
+        record = self.record
+        perf_counter = time.perf_counter
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            result = function(*args, **kwargs)
+            seconds = perf_counter() - start
+            label = _label(args[0]) if args else None
+            written = 0
+            if output_bytes:
+                if isinstance(result, str):
+                    written = len(result.encode('utf-8'))
+                elif isinstance(result, bytes):
+                    written = len(result)
+            record(stage, seconds, label, bytes_written=written)
+            return result
+
+        return wrapper
+
+    def timed_iter(self, stage, iterable):
+        """Wrap an iterable to record producing each item as a stage item."""
+        record = self.record
+        perf_counter = time.perf_counter
+        iterator = iter(iterable)
+        while True:
+            start = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            record(stage, perf_counter() - start, _label(item))
+            yield item
+
+    def summary(self):
+        """Return the statistics as a JSON serializable dict."""
+        return collections.OrderedDict(
+            (stage, stage_stats.summary())
+            for stage, stage_stats in self._stages.items())
+
+    def dump_json(self, file):
+        """Write the statistics to a text file as JSON."""
+        json.dump(self.summary(), file, indent=2)
+
+    def report(self, file):
+        """Write a human readable report to a text file."""
+        file.write('{:<24} {:>8} {:>10} {:>10} {:>10} {:>10}\n'.format(
+            'stage', 'count', 'total', 'p50', 'p90', 'p99'))
+        for stage, summary in self.summary().items():
+            file.write(
+                '{:<24} {count:>8} {total:>10.4f} {p50:>10.6f}'
+                ' {p90:>10.6f} {p99:>10.6f}\n'.format(stage, **summary))
+            for seconds, label in summary['slowest']:
+                file.write('    {:.6f} {}\n'.format(seconds, label))
+
+
+class _StageStats:
+
+    __slots__ = ('durations', 'bytes_read', 'bytes_written', 'slowest')
+
+    def __init__(self):
+        self.durations = []
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.slowest = []
+
+    def summary(self):
+        durations = sorted(self.durations)
+        return collections.OrderedDict([
+            ('count', len(durations)),
+            ('total', sum(durations)),
+            ('p50', _percentile(durations, 50)),
+            ('p90', _percentile(durations, 90)),
+            ('p99', _percentile(durations, 99)),
+            ('max', durations[-1] if durations else 0.0),
+            ('bytes_read', self.bytes_read),
+            ('bytes_written', self.bytes_written),
+            ('slowest', sorted(self.slowest, reverse=True)),
+        ])
+
+
+def _percentile(sorted_values, percent):
+    """Return a percentile of sorted values using the nearest rank.
+
+    >>> _percentile([1, 2, 3, 4], 50)
+    2
+    >>> _percentile([1, 2, 3, 4], 99)
+    4
+    """
+    if not sorted_values:
+        return 0.0
+    rank = -(-len(sorted_values) * percent // 100)
+    return sorted_values[max(rank, 1) - 1]
+
+
+def _label(item):
+    """Return a label for an item for reporting."""
+    path = getattr(item, 'path', None)
+    if path is None:
+        return None
+    return str(path)
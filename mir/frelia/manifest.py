@@ -0,0 +1,130 @@
+"""Build manifest.
+
+A manifest records the state of the source files seen by a previous build, so
+that unchanged files can be detected and served without being parsed again.
+
+Classes:
+
+Manifest -- Persistent mapping of file paths to entries
+Entry -- Recorded state of a single source file
+Changes -- Paths that changed since the previous build
+
+Functions:
+
+load_state -- Load pickled build state from a file
+save_state -- Save pickled build state to a file atomically
+"""
+
+import collections
+import hashlib
+import os
+import pickle
+
+
+Entry = collections.namedtuple(
+    'Entry', 'mtime_ns size digest header body_offset')
+
+
+class Manifest:
+
+    """Persistent mapping of source file paths to entries.
+
+    Paths are stored as strings.  After a pass of an incremental loader, the
+    changes attribute describes which files were added, modified or deleted
+    during that pass.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = {} if entries is None else entries
+        self.changes = Changes()
+
+    def __repr__(self):
+        return '<{cls} with {count} entries>'.format(
+            cls=type(self).__qualname__,
+            count=len(self.entries))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, path):
+        return str(path) in self.entries
+
+    def get(self, path):
+        """Return the entry for path or None."""
+        return self.entries.get(str(path))
+
+    def set(self, path, entry):
+        self.entries[str(path)] = entry
+
+    def discard(self, path):
+        self.entries.pop(str(path), None)
+
+    @classmethod
+    def load(cls, filepath):
+        """Load a manifest from a file.
+
+        Return an empty manifest if the file does not exist.
+        """
+        return cls(load_state(filepath, {}))
+
+    def save(self, filepath):
+        """Save the manifest to a file atomically."""
+        save_state(filepath, self.entries)
+
+
+class Changes:
+
+    """Paths that changed since the previous build."""
+
+    __slots__ = ('added', 'modified', 'deleted')
+
+    def __init__(self):
+        self.added = set()
+        self.modified = set()
+        self.deleted = set()
+
+    def __repr__(self):
+        return ('<{cls} with added={this.added!r}, modified={this.modified!r},'
+                ' deleted={this.deleted!r}>'
+                .format(cls=type(self).__qualname__, this=self))
+
+    def __bool__(self):
+        return bool(self.added or self.modified or self.deleted)
+
+    @property
+    def changed(self):
+        """Paths that were added or modified."""
+        return self.added | self.modified
+
+
+def load_state(filepath, default):
+    """Load build state saved with save_state().
+
+    Return default if the file does not exist.
+    """
+    try:
+        with open(filepath, 'rb') as file:
+            return pickle.load(file)
+    except FileNotFoundError:
+        return default
+
+
+def save_state(filepath, state):
+    """Save picklable build state to a file atomically."""
+    filepath = os.fspath(filepath)
+    tmp_filepath = filepath + '.tmp'
+    with open(tmp_filepath, 'wb') as file:
+        pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_filepath, filepath)
+
+
+def digest(data: bytes):
+    """Return the content hash of file data."""
+    return hashlib.sha1(data).hexdigest()
+
+
+def is_fresh(entry, stat):
+    """Return True if entry matches a file's stat result."""
+    return (entry is not None
+            and entry.mtime_ns == stat.st_mtime_ns
+            and entry.size == stat.st_size)
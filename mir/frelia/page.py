@@ -1,7 +1,12 @@
 import abc
+import asyncio
+import multiprocessing
+import pathlib
+import threading
 
 import mir.frelia.fs as fslib
 import mir.frelia.enja as enja
+import mir.frelia.manifest as manifestlib
 
 
 class _RecursiveLoader:
@@ -9,11 +14,47 @@ class _RecursiveLoader:
     def __init__(self, page_loader):
         self._page_loader = page_loader
 
-    def __call__(self, rootdir):
-        for filepath in fslib.find_files(rootdir):
+    def __call__(self, rootdir, **find_options):
+        """Yield pages for the files under rootdir.
+
+        find_options are passed to mir.frelia.fs.find_files() to filter the
+        files that are loaded.
+        """
+        for filepath in fslib.find_files(rootdir, **find_options):
             yield self._page_loader(filepath)
 
 
+class _ParallelLoader:
+
+    """Recursive page loader that loads files across a process pool.
+
+    The page loader, pages and documents must be picklable.
+    """
+
+    def __init__(self, page_loader):
+        self._page_loader = page_loader
+
+    def __call__(self, rootdir, processes=None, chunksize=16, ordered=True,
+                 **find_options):
+        """Yield pages under rootdir, loading them in worker processes.
+
+        processes is the number of worker processes, defaulting to the number
+        of CPUs.  Files are sent to workers in chunks of chunksize.  If ordered
+        is false, pages are yielded as soon as they are loaded instead of in
+        the order the files were found.  find_options are passed to
+        mir.frelia.fs.find_files().
+        """
+        with multiprocessing.Pool(processes) as pool:
+            if ordered:
+                imap = pool.imap
+            else:
+                imap = pool.imap_unordered
+            yield from imap(
+                self._page_loader,
+                fslib.find_files(rootdir, **find_options),
+                chunksize)
+
+
 class _PageLoader:
 
     def __init__(self, page_class, document_loader):
@@ -21,12 +62,161 @@ class _PageLoader:
         self._document_loader = document_loader
 
     def __call__(self, filepath):
-        with open(filepath) as file:
+        with open(filepath, 'rb') as file:
             document = self._document_loader(file)
         page = self._page_class.from_document(filepath, document)
         return page
 
 
+class _AsyncLoader:
+
+    """Recursive page loader that reads files concurrently with asyncio.
+
+    This is for file systems with high latency, such as network mounts.  The
+    directory walk and file reads are blocking calls that run in an executor.
+    Reads start as the walk finds files, with at most concurrency reads in
+    flight.  Files are parsed in the event loop as their reads complete, and
+    pages are yielded in completion order.
+
+    read_file is a callable that returns the contents of a file as bytes.
+    """
+
+    def __init__(self, page_class, document_loader, read_file):
+        self._page_class = page_class
+        self._document_loader = document_loader
+        self._read_file = read_file
+
+    async def __call__(self, rootdir, concurrency=16, executor=None,
+                       **find_options):
+        """Asynchronously yield pages for the files under rootdir.
+
+        executor is a concurrent.futures executor for the blocking calls,
+        defaulting to the event loop's default executor.  The walk occupies
+        one of its threads until it finishes.  find_options are passed to
+        mir.frelia.fs.find_files().
+        """
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+        walk = loop.run_in_executor(
+            executor, _find_files_into_queue,
+            rootdir, find_options, loop, queue, stop)
+        get_path = asyncio.ensure_future(queue.get())
+        pending = {}
+        try:
+            while get_path is not None or pending:
+                waiting = set(pending)
+                if get_path is not None and len(pending) < concurrency:
+                    waiting.add(get_path)
+                done, _ = await asyncio.wait(
+                    waiting, return_when=asyncio.FIRST_COMPLETED)
+                if get_path in done:
+                    filepath = get_path.result()
+                    if filepath is None:
+                        get_path = None
+                        await walk
+                    else:
+                        future = loop.run_in_executor(
+                            executor, self._read_file, filepath)
+                        pending[future] = filepath
+                        get_path = asyncio.ensure_future(queue.get())
+                for page in self._load_done(done, pending):
+                    yield page
+        finally:
+            stop.set()
+            if get_path is not None:
+                get_path.cancel()
+            for future in pending:
+                future.cancel()
+
+    def _load_done(self, done, pending):
+        """Return the pages for the completed reads in done."""
+        load_bytes = self._document_loader.load_bytes
+        from_document = self._page_class.from_document
+        pages = []
+        for future in done:
+            filepath = pending.pop(future, None)
+            if filepath is not None:
+                pages.append(
+                    from_document(filepath, load_bytes(future.result())))
+        return pages
+
+
+def _find_files_into_queue(rootdir, find_options, loop, queue, stop):
+    """Put the files under rootdir into an asyncio queue from a thread.
+
+    None is put into the queue when the walk ends, including if it fails,
+    unless the walk was stopped because the consumer is gone.
+    """
+    put = queue.put_nowait
+    try:
+        for filepath in fslib.find_files(rootdir, **find_options):
+            if stop.is_set():
+                return
+            loop.call_soon_threadsafe(put, filepath)
+    finally:
+        if not stop.is_set():
+            loop.call_soon_threadsafe(put, None)
+
+
+def _read_file(filepath):
+    with open(filepath, 'rb') as file:
+        return file.read()
+
+
+class _IncrementalLoader:
+
+    """Recursive page loader that skips parsing unchanged files.
+
+    Files are loaded with a mir.frelia.enja.CachingLoader, so unchanged files
+    are loaded using the header recorded in the manifest, reading only the
+    document body.
+
+    The manifest is updated in place.  Once the generator is exhausted,
+    manifest.changes describes the files that were added, modified or deleted
+    under the root directory since the previous pass.
+    """
+
+    def __init__(self, page_class, document_class):
+        self._page_class = page_class
+        self._document_class = document_class
+
+    def __call__(self, rootdir, manifest, **find_options):
+        """Yield pages for the files under rootdir.
+
+        find_options are passed to mir.frelia.fs.find_files().  Manifest
+        entries under rootdir for files that are filtered out are treated as
+        deleted.
+        """
+        changes = manifest.changes = manifestlib.Changes()
+        loader = enja.CachingLoader(self._document_class, manifest)
+        seen = set()
+        add_seen = seen.add
+        load_page = self._load_page
+        for filepath in fslib.find_files(rootdir, **find_options):
+            add_seen(str(filepath))
+            yield load_page(filepath, loader, manifest, changes)
+        # Manifest keys are normalized by pathlib, so compare path parts.
+        root_parts = pathlib.PurePath(rootdir).parts
+        depth = len(root_parts)
+        for path in list(manifest.entries):
+            if (path not in seen
+                    and pathlib.PurePath(path).parts[:depth] == root_parts):
+                manifest.discard(path)
+                changes.deleted.add(path)
+
+    def _load_page(self, filepath, loader, manifest, changes):
+        is_new = filepath not in manifest
+        with open(filepath, 'rb') as file:
+            document, changed = loader.load_file(file, filepath)
+        if changed:
+            if is_new:
+                changes.added.add(str(filepath))
+            else:
+                changes.modified.add(str(filepath))
+        return self._page_class.from_document(filepath, document)
+
+
 class Page(abc.ABC):
 
     """Page interface.
@@ -78,4 +268,8 @@ class BasicPage(Page):
         }
 
 
-load_pages = _RecursiveLoader(_PageLoader(BasicPage, enja.load))
+load_page = _PageLoader(BasicPage, enja.load)
+load_pages = _RecursiveLoader(load_page)
+load_pages_in_parallel = _ParallelLoader(load_page)
+load_pages_async = _AsyncLoader(BasicPage, enja.load, _read_file)
+load_pages_incrementally = _IncrementalLoader(BasicPage, enja.Document)
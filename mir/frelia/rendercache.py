@@ -0,0 +1,239 @@
+"""Content addressed render cache.
+
+Rendering is a pure function of the template, the page content and metadata,
+and the base context, so rendered output can be cached on disk keyed by a
+hash of those inputs and reused by later builds:
+
+    cache = RenderCache('.cache/render', max_bytes=512 * 1024 * 1024)
+    renderer = CachedRenderer(alchemy.TemplateRenderer(base_mapping), cache)
+    for page in pages:
+        text = renderer.render(page)
+    print(cache.stats)
+
+Wrapped renderers must provide a fingerprint(page) method returning bytes
+that identify every input other than the page, as TemplateRenderer and
+JinjaRenderer do.  Page content and metadata, and base mappings, may only
+contain the plain values that fingerprint() accepts.
+"""
+
+import collections
+from collections.abc import Mapping, Set
+import datetime
+import hashlib
+import json
+import os
+import pathlib
+
+
+def fingerprint(value):
+    """Return a stable byte representation of a value for hashing.
+
+    Mappings and sets are sorted, so the result does not depend on insertion
+    order.  Only mappings, sets, lists, tuples and plain values are accepted,
+    because the representation of other objects may differ between builds.
+    Raise TypeError for other values.
+
+    >>> a = fingerprint({'b': 1, 'a': [2, {3}]})
+    >>> a == fingerprint({'a': [2, {3}], 'b': 1})
+    True
+    """
+    return _stable_repr(value).encode('utf-8', 'surrogatepass')
+
+
+_PLAIN_TYPES = (
+    str, bytes, int, float, type(None),
+    datetime.date, datetime.time, datetime.timedelta,
+    pathlib.PurePath,
+)
+
+
+def _stable_repr(value):
+    if isinstance(value, Mapping):
+        items = sorted(
+            (_stable_repr(key), _stable_repr(item))
+            for key, item in value.items())
+        return '{' + ', '.join(key + ': ' + item for key, item in items) + '}'
+    if isinstance(value, (Set, frozenset)):
+        return '{' + ', '.join(sorted(map(_stable_repr, value))) + '}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(map(_stable_repr, value)) + ']'
+    if isinstance(value, _PLAIN_TYPES):
+        return repr(value)
+    raise TypeError('cannot fingerprint {!r} object'.format(
+        type(value).__qualname__))
+
+
+class CachedRenderer:
+
+    """Renderer wrapper that serves unchanged pages from a RenderCache."""
+
+    def __init__(self, renderer, cache):
+        self._renderer = renderer
+        self._cache = cache
+
+    def __repr__(self):
+        return '{cls}({renderer!r}, {cache!r})'.format(
+            cls=type(self).__qualname__,
+            renderer=self._renderer,
+            cache=self._cache)
+
+    def render(self, page, **used):
+        """Render a page, using the cache if possible.
+
+        Keyword arguments are dependency tracking sets passed on to the
+        wrapped renderer, such as used_names for TemplateRenderer and
+        used_templates for JinjaRenderer.  The names added to them are cached
+        with the text and added again on cache hits.
+        """
+        key = self.key(page, used)
+        value = self._cache.get(key)
+        if value is None:
+            page_used = {name: set() for name in used}
+            text = self._renderer.render(page, **page_used)
+            if used:
+                value = json.dumps({
+                    'text': text,
+                    'used': {name: sorted(names)
+                             for name, names in page_used.items()},
+                })
+            else:
+                value = text
+            self._cache.put(key, value)
+        elif used:
+            value = json.loads(value)
+            text = value['text']
+            page_used = value['used']
+        else:
+            return value
+        for name, names in used.items():
+            names.update(page_used[name])
+        return text
+
+    def key(self, page, used=()):
+        """Return the cache key for rendering a page.
+
+        used is an iterable of the names of the dependency tracking arguments
+        to render().
+        """
+        digest = hashlib.sha256()
+        digest.update(type(self._renderer).__qualname__.encode())
+        for part in (self._renderer.fingerprint(page),
+                     fingerprint(page.content),
+                     fingerprint(page.metadata),
+                     fingerprint(sorted(used))):
+            digest.update(len(part).to_bytes(8, 'big'))
+            digest.update(part)
+        return digest.hexdigest()
+
+
+class RenderCache:
+
+    """Disk cache of rendered text with size bounded LRU eviction.
+
+    Entries are stored as files in directory.  When the total size exceeds
+    max_bytes, the least recently used entries are removed.  Recency is kept
+    in file modification times, so it persists between builds.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self._directory = os.fspath(directory)
+        self._max_bytes = max_bytes
+        self.stats = RenderCacheStats()
+        self._entries = collections.OrderedDict()
+        os.makedirs(self._directory, exist_ok=True)
+        self._scan()
+
+    def __repr__(self):
+        return '{cls}({directory!r}, max_bytes={max_bytes!r})'.format(
+            cls=type(self).__qualname__,
+            directory=self._directory,
+            max_bytes=self._max_bytes)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached text for a key, or None."""
+        try:
+            with open(self._path(key), 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        os.utime(self._path(key))
+        return data.decode('utf-8')
+
+    def put(self, key, text):
+        """Cache text for a key."""
+        data = text.encode('utf-8')
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+        self.stats.bytes -= self._entries.pop(key, 0)
+        self._entries[key] = len(data)
+        self.stats.bytes += len(data)
+        self._evict()
+
+    def _path(self, key):
+        return os.path.join(self._directory, key[:2], key)
+
+    def _scan(self):
+        """Load the existing entries, least recently used first."""
+        found = []
+        with os.scandir(self._directory) as subdirs:
+            for subdir in subdirs:
+                if not subdir.is_dir():
+                    continue
+                with os.scandir(subdir.path) as entries:
+                    for entry in entries:
+                        if entry.name.endswith('.tmp'):
+                            continue
+                        stat = entry.stat()
+                        found.append(
+                            (stat.st_mtime_ns, entry.name, stat.st_size))
+        for mtime_ns, key, size in sorted(found):
+            self._entries[key] = size
+            self.stats.bytes += size
+        self._evict()
+
+    def _evict(self):
+        entries = self._entries
+        stats = self.stats
+        while stats.bytes > self._max_bytes and entries:
+            key, size = entries.popitem(last=False)
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+            stats.bytes -= size
+            stats.evictions += 1
+
+
+class RenderCacheStats:
+
+    """Statistics for a RenderCache."""
+
+    __slots__ = ('hits', 'misses', 'evictions', 'bytes')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+
+    def __repr__(self):
+        return ('<{cls} with hits={this.hits!r}, misses={this.misses!r},'
+                ' evictions={this.evictions!r}, bytes={this.bytes!r}>'
+                .format(cls=type(self).__qualname__, this=self))
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups that were hits."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -4,8 +4,11 @@ http://www.sitemaps.org/protocol.html
 """
 
 import datetime
+import gzip
 import io
 import numbers
+import pathlib
+import urllib.parse
 import xml.etree.ElementTree as ET
 
 
@@ -98,17 +101,119 @@ def write_sitemap_urlset(file: io.TextIOBase, urls):
     """Write sitemap urlset to a file.
 
     urls is an iterable of URL instances.  file is a text file for writing.
+    Each URL is written as it is taken from urls, so urls can be a generator
+    of any length.
     """
-    urlset = ET.Element('urlset', {
-        'xmlns': 'http://www.sitemaps.org/schemas/sitemap/0.9',
-        'xmlns:xsi': 'http://www.w3.org/2001/XMLSchema-instance',
-        'xsi:schemaLocation': ' '.join((
-            'http://www.sitemaps.org/schemas/sitemap/0.9',
-            'http://www.sitemaps.org/schemas/sitemap/0.9/sitemap.xsd')),
-    })
-    urlset.extend(url.to_etree() for url in urls)
-    document = ET.ElementTree(urlset)
-    document.write(file, encoding='unicode', xml_declaration=True)
+    file.write(_xml_declaration(file))
+    file.write(_URLSET_START)
+    write = file.write
+    for url in urls:
+        write(_url_to_string(url))
+    file.write(_URLSET_END)
+
+
+def write_sitemap_index(file: io.TextIOBase, locs):
+    """Write sitemap index to a file.
+
+    locs is an iterable of sitemap URLs.  file is a text file for writing.
+    """
+    file.write(_xml_declaration(file))
+    file.write(_SITEMAPINDEX_START)
+    write = file.write
+    tostring = ET.tostring
+    for loc in locs:
+        sitemap = ET.Element('sitemap')
+        ET.SubElement(sitemap, 'loc').text = loc
+        write(tostring(sitemap, encoding='unicode'))
+    file.write(_SITEMAPINDEX_END)
+
+
+MAX_URLS = 50000
+MAX_BYTES = 50 * 1024 * 1024
+
+
+def write_sitemaps(dirpath, base_url, urls,
+                   max_urls=MAX_URLS, max_bytes=MAX_BYTES, compress=False):
+    """Write URLs to as many sitemap files as needed, with an index.
+
+    urls is an iterable of URL instances, which are written as they are taken
+    from urls.  URLs are written to files named sitemap-1.xml, sitemap-2.xml,
+    etc. in dirpath, starting a new file whenever a file would exceed max_urls
+    URLs or max_bytes bytes (uncompressed).  If compress is true, the files are
+    gzipped and named with a .gz suffix.
+
+    An index of the files is written to sitemap.xml in dirpath.  base_url is
+    the URL of dirpath, which is joined with the file names for the index.
+
+    Return a list of the paths of the sitemap files written, not including
+    the index.
+    """
+    dirpath = pathlib.Path(dirpath)
+    suffix = '.xml.gz' if compress else '.xml'
+    overhead = len((_XML_DECLARATION + _URLSET_START + _URLSET_END).encode())
+    paths = []
+    file = None
+    count = written = 0
+    try:
+        for url in urls:
+            text = _url_to_string(url)
+            size = len(text.encode())
+            if (file is None or count >= max_urls
+                    or written + size > max_bytes):
+                if file is not None:
+                    _close_urlset(file)
+                path = dirpath / 'sitemap-{}{}'.format(len(paths) + 1, suffix)
+                paths.append(path)
+                file = _open_urlset(path, compress)
+                count = 0
+                written = overhead
+            file.write(text)
+            count += 1
+            written += size
+    finally:
+        if file is not None:
+            _close_urlset(file)
+    locs = (urllib.parse.urljoin(base_url, path.name) for path in paths)
+    with open(dirpath / 'sitemap.xml', 'w', encoding='utf-8') as file:
+        write_sitemap_index(file, locs)
+    return paths
+
+
+def _open_urlset(path, compress):
+    if compress:
+        file = gzip.open(path, 'wt', encoding='utf-8')
+    else:
+        file = open(path, 'w', encoding='utf-8')
+    file.write(_XML_DECLARATION)
+    file.write(_URLSET_START)
+    return file
+
+
+def _close_urlset(file):
+    file.write(_URLSET_END)
+    file.close()
+
+
+def _xml_declaration(file):
+    """Return an XML declaration of the encoding of a text file."""
+    encoding = getattr(file, 'encoding', None) or 'UTF-8'
+    return "<?xml version='1.0' encoding='{}'?>\n".format(encoding)
+
+
+def _url_to_string(url):
+    return ET.tostring(url.to_etree(), encoding='unicode')
+
+
+_XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8'?>\n"
+_URLSET_START = (
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+    ' xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
+    ' xsi:schemaLocation="http://www.sitemaps.org/schemas/sitemap/0.9'
+    ' http://www.sitemaps.org/schemas/sitemap/0.9/sitemap.xsd">')
+_URLSET_END = '</urlset>'
+_SITEMAPINDEX_START = (
+    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
+_SITEMAPINDEX_END = '</sitemapindex>'
 
 
 class ValidationError(Exception):
@@ -0,0 +1,102 @@
+"""Content change watcher.
+
+Watcher polls a content directory and loads only the pages that were added
+or modified since the last poll, so a site can be rebuilt incrementally:
+
+    watcher = Watcher('content', exclude=['*~'])
+    for changes, pages in watcher.watch():
+        write_outputs(pipeline(pages))
+        remove_outputs(changes.deleted)
+        write_feed_and_sitemap()
+
+Changes are detected by comparing file modification times and sizes, so
+unchanged files are never opened.  Polling is used because the standard
+library has no portable file system notification API.
+"""
+
+import logging
+import pathlib
+import time
+
+import mir.frelia.fs as fslib
+import mir.frelia.manifest as manifestlib
+import mir.frelia.page as pagelib
+
+logger = logging.getLogger(__name__)
+
+
+class Watcher:
+
+    """Poll a directory tree for added, modified and deleted pages.
+
+    page_loader is a callable that loads a page from a file path.
+    find_options are passed to mir.frelia.fs.scan_files() to filter the
+    files that are watched.
+    """
+
+    def __init__(self, rootdir, page_loader=pagelib.load_page,
+                 **find_options):
+        self._rootdir = rootdir
+        self._page_loader = page_loader
+        self._find_options = find_options
+        self._snapshot = {}
+
+    def __repr__(self):
+        return ('{cls}(rootdir={rootdir!r}, page_loader={page_loader!r})'
+                .format(cls=type(self).__qualname__,
+                        rootdir=self._rootdir,
+                        page_loader=self._page_loader))
+
+    def poll(self):
+        """Check for changes since the last poll.
+
+        Return a mir.frelia.manifest.Changes instance and a list of the pages
+        that were added or modified.  The first poll reports every file as
+        added.
+
+        Files that fail to load, for example because they were deleted after
+        the scan or are partially written, are logged and left out of the
+        changes, so they are reported again by the next poll.
+        """
+        snapshot = {
+            path: (stat.st_mtime_ns, stat.st_size)
+            for path, stat in fslib.scan_files(
+                self._rootdir, with_stat=True, as_str=True,
+                **self._find_options)
+        }
+        previous = self._snapshot
+        changes = manifestlib.Changes()
+        for path, state in snapshot.items():
+            previous_state = previous.get(path)
+            if previous_state is None:
+                changes.added.add(path)
+            elif previous_state != state:
+                changes.modified.add(path)
+        changes.deleted.update(previous.keys() - snapshot.keys())
+        load_page = self._page_loader
+        pages = []
+        for path in sorted(changes.changed):
+            try:
+                pages.append(load_page(pathlib.Path(path)))
+            except Exception:
+                logger.exception('Failed to load %s', path)
+                changes.added.discard(path)
+                changes.modified.discard(path)
+                if path in previous:
+                    snapshot[path] = previous[path]
+                else:
+                    del snapshot[path]
+        self._snapshot = snapshot
+        return changes, pages
+
+    def watch(self, interval=1.0):
+        """Poll forever, yielding the results of polls that found changes.
+
+        interval is the number of seconds to wait between polls.
+        """
+        while True:
+            changes, pages = self.poll()
+            if changes:
+                logger.debug('Found changes %r', changes)
+                yield changes, pages
+            time.sleep(interval)
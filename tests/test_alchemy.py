@@ -0,0 +1,223 @@
+import datetime
+import functools
+
+import jinja2
+import pytest
+
+from mir.frelia import alchemy
+import mir.frelia.page as pagelib
+
+
+class _Page(pagelib.BasicPage):
+
+    def __init__(self, path, content, metadata):
+        super().__init__(path, content)
+        self._metadata = metadata
+
+    @property
+    def metadata(self):
+        return self._metadata
+
+
+@pytest.mark.parametrize('content,metadata', [
+    ('$foo ${bar} $$baz $missing $', {'foo': 'sophie'}),
+    ('$site_title $site_author_name', {}),
+    ('$site_title $site_author_name', {'site': {'title': 'Atelier'}}),
+    ('$site_title $site', {'site': 'Firis'}),
+    ('$site_title $site_author_name', {'site': 's'}),
+])
+@pytest.mark.parametrize('lazy', [False, True])
+def test_template_renderer_matches_render(content, metadata, lazy):
+    base_mapping = {
+        'bar': 'plachta',
+        'site': {'title': 'Sophie', 'author': {'name': 'Gust'}},
+        'site_title': 'Lydie',
+    }
+    page = _Page('foo', content, metadata)
+    renderer = alchemy.TemplateRenderer(base_mapping, lazy=lazy)
+    assert renderer.render(page) == alchemy.render(page, base_mapping)
+
+
+def test_template_renderer_caches_templates():
+    renderer = alchemy.TemplateRenderer({'foo': 'bar'}, cache_size=1)
+    page = _Page('foo', '$foo', {})
+    assert renderer.render(page) == 'bar'
+    assert renderer.render(page) == 'bar'
+    assert renderer._compile.cache_info().hits == 1
+
+
+def test_parse_date_from_path():
+    got = alchemy.parse_date_from_path('blog/2016/01/02/post')
+    assert got == datetime.date(2016, 1, 2)
+
+
+def test_parse_date_from_path_missing_date():
+    with pytest.raises(ValueError):
+        alchemy.parse_date_from_path('blog/post')
+
+
+def test_render_pages():
+    pages = [_Page('foo', '$foo', {}), _Page('bar', '$foo', {'foo': 'bar'})]
+    got = alchemy.render_pages(pages, {'foo': 'baz'})
+    assert [text for page, text in got] == ['baz', 'bar']
+
+
+def test_render_pages_with_jinja(env):
+    renderer = alchemy.JinjaRenderer(env)
+    page = _Page('foo', 'spam', {})
+    page.template = 'base.html'
+    got = list(alchemy.render_pages_with_jinja([page], renderer))
+    assert got == [(page, "base.html [('content', 'spam')]")]
+
+
+def test_set_dates_from_paths():
+    page = _Page('blog/2016/01/02/post', '', {})
+    got = list(alchemy.set_dates_from_paths([page]))
+    assert got[0].date == datetime.date(2016, 1, 2)
+
+
+def test_set_dates_from_paths_loaded_pages(tmpdir):
+    (tmpdir / '2016/01/02').mkdir(parents=True)
+    (tmpdir / '2016/01/02/post').write_text('sophie: prachta\n---\nfiris')
+    got = list(alchemy.set_dates_from_paths(pagelib.load_pages(tmpdir)))
+    assert got[0].date == datetime.date(2016, 1, 2)
+
+
+def test_enrich():
+    page = _Page('foo', '', {})
+    got = list(alchemy.enrich([page], lambda page: setattr(page, 'foo', 1)))
+    assert got[0].foo == 1
+
+
+def test_pipeline():
+    pipeline = alchemy.Pipeline(
+        alchemy.set_dates_from_paths,
+        functools.partial(alchemy.render_pages, base_mapping={'foo': 'bar'}))
+    page = _Page('blog/2016/01/02/post', '$foo', {})
+    got = list(pipeline([page]))
+    assert got == [(page, 'bar')]
+    assert page.date == datetime.date(2016, 1, 2)
+
+
+def test_pipeline_run_parallel():
+    pipeline = alchemy.Pipeline(
+        functools.partial(alchemy.render_pages, base_mapping={'foo': 'bar'}))
+    pages = [pagelib.BasicPage(str(i), '$foo $path') for i in range(10)]
+    got = pipeline.run_parallel(pages, processes=2, chunksize=3)
+    assert [text for page, text in got] == [
+        'bar {}'.format(i) for i in range(10)]
+
+
+def test_jinja_renderer_render_default_template(env):
+    renderer = alchemy.JinjaRenderer(env)
+    page = _Page('foo', 'spam', {'title': 'eggs'})
+    got = renderer.render(page)
+    assert got == "base.html [('content', 'spam'), ('title', 'eggs')]"
+
+
+def test_jinja_renderer_resolves_template_once(env):
+    renderer = alchemy.JinjaRenderer(env)
+    page = _Page('foo', 'spam', {})
+    renderer.render(page)
+    renderer.render(page)
+    env.get_template.assert_called_once_with('base.html')
+
+
+def test_jinja_renderer_invalidate(env):
+    renderer = alchemy.JinjaRenderer(env)
+    page = _Page('foo', 'spam', {})
+    renderer.render(page)
+    renderer.invalidate()
+    renderer.render(page)
+    assert env.get_template.call_count == 2
+
+
+def test_jinja_renderer_precompile(env):
+    renderer = alchemy.JinjaRenderer(env)
+    renderer.precompile(['base.html', 'post.html'])
+    assert env.get_template.call_count == 2
+    renderer.render(_Page('foo', 'spam', {}))
+    assert env.get_template.call_count == 2
+
+
+def test_jinja_renderer_render_as_template(env):
+    renderer = alchemy.JinjaRenderer(env)
+    page = _Page('foo', 'spam', {'title': 'eggs'})
+    assert renderer.render_as_template(page) == "spam [('title', 'eggs')]"
+    renderer.render_as_template(page)
+    env.from_string.assert_called_once_with('spam')
+
+
+def _make_renderer():
+    env = jinja2.Environment(loader=jinja2.DictLoader({
+        'base.html': '<p>{{ content }}</p>',
+    }))
+    return alchemy.JinjaRenderer(env)
+
+
+def _output_path(page):
+    return page.output_path
+
+
+def test_parallel_jinja_renderer():
+    renderer = alchemy.ParallelJinjaRenderer(
+        _make_renderer, processes=2, chunksize=2)
+    pages = [pagelib.BasicPage(str(i), str(i)) for i in range(5)]
+    got = list(renderer.render_all(pages))
+    assert got == ['<p>{}</p>'.format(i) for i in range(5)]
+
+
+def test_parallel_jinja_renderer_output_path(tmpdir):
+    renderer = alchemy.ParallelJinjaRenderer(_make_renderer, processes=2)
+    page = pagelib.BasicPage('foo', 'spam')
+    page.output_path = str(tmpdir / 'foo/index.html')
+    got = list(renderer.render_all([page], output_path=_output_path))
+    assert got == [page.output_path]
+    assert (tmpdir / 'foo/index.html').read_text() == '<p>spam</p>'
+
+
+@pytest.mark.parametrize('path', [
+    'blog/2016/01/02/post',
+    'blog/2016/01/02',
+    'blog/2016/01/02/',
+    'blog/2016/01/02/03',
+    'blog/2016/02/30/post',
+    'blog/2016/2/9/post.html',
+    'post',
+    'a/b/c',
+])
+def test_parse_dates_from_paths_matches_parse_date_from_path(path):
+    try:
+        expected = alchemy.parse_date_from_path(path)
+    except ValueError:
+        expected = None
+    assert list(alchemy.parse_dates_from_paths([path])) == [expected]
+
+
+def test_parse_dates_from_paths_cached():
+    paths = ['blog/2016/01/02/foo', 'blog/2016/01/02/bar', 'blog/baz']
+    got = list(alchemy.parse_dates_from_paths(paths))
+    assert got == [datetime.date(2016, 1, 2)] * 2 + [None]
+
+
+def test_set_dates_from_paths_missing_date():
+    page = _Page('blog/post', '', {})
+    with pytest.raises(ValueError):
+        list(alchemy.set_dates_from_paths([page]))
+
+
+def test_flatten_mapping_deep():
+    mapping = {'a': {'b': {'c': {'d': 1}}, 'e': 2}, 'f': 3}
+    got = alchemy._flatten_mapping(mapping)
+    assert got == {'a_b_c_d': 1, 'a_e': 2, 'f': 3}
+
+
+def test_flat_view():
+    mapping = {'a': {'b': {'c': {'d': 1}}, 'e': 2}, 'f_g': 3}
+    view = alchemy.FlatView(mapping)
+    assert view['a_b_c_d'] == 1
+    assert view['f_g'] == 3
+    assert 'a_b' not in view
+    assert 'a_x' not in view
+    assert dict(view) == alchemy._flatten_mapping(mapping)
+    assert len(view) == 3
@@ -147,3 +147,126 @@ def test__TextElement_type():
         text='girl meets girl',
         type='text/html')
     assert element.get('type') == 'text/html'
+
+
+def test_render_matches_etree():
+    """Test streaming rendering matches serializing the tree."""
+    feed = atom.Feed(
+        id='http://example.com/',
+        title='Example & site',
+        updated=datetime.datetime(2016, 1, 8))
+    feed.categories.append(atom.Category('dork'))
+    feed.entries.append(atom.Entry(
+        id='http://example.com/pandora',
+        title='<Pandora>',
+        updated=datetime.datetime(2016, 1, 8)))
+    file = io.StringIO()
+    feed.write(file)
+    declaration, document = file.getvalue().split('\n', 1)
+    assert document == ET.tostring(feed.to_etree(), encoding='unicode')
+
+
+def test_render_declares_file_encoding(tmpdir):
+    """Test rendering to a file that is not UTF-8."""
+    feed = atom.Feed(
+        id='http://example.com/',
+        title='Café',
+        updated=datetime.datetime(2016, 1, 8))
+    path = tmpdir / 'feed.xml'
+    with open(str(path), 'w', encoding='latin-1') as file:
+        feed.write(file)
+    root = ET.parse(str(path)).getroot()
+    assert root.find('{http://www.w3.org/2005/Atom}title').text == 'Café'
+
+
+def test_render_entry_generator():
+    """Test rendering entries from a generator."""
+    feed = atom.Feed(
+        id='http://example.com/',
+        title='Example site',
+        updated=datetime.datetime(2016, 1, 8))
+    feed.entries = (
+        atom.Entry(id=str(i), title='Pandora',
+                   updated=datetime.datetime(2016, 1, 8))
+        for i in range(2))
+    file = io.StringIO()
+    feed.write(file)
+    assert file.getvalue().count('<entry>') == 2
+
+
+def test_entry_has_no_dict():
+    """Test Entry uses slots."""
+    entry = atom.Entry(
+        id='http://example.com/pandora',
+        title='Pandora',
+        updated=datetime.datetime(2016, 1, 8))
+    assert not hasattr(entry, '__dict__')
+    with pytest.raises(AttributeError):
+        entry.foo = 'bar'
+
+
+def _make_feed(key):
+    return atom.Feed(
+        id='http://example.com/{}'.format(key),
+        title='Example site',
+        updated=datetime.datetime(2016, 1, 8))
+
+
+def _make_entries():
+    for i, term in enumerate(['sophie', 'firis', 'sophie']):
+        entry = atom.Entry(
+            id='http://example.com/{}'.format(i),
+            title='Post {}'.format(i),
+            updated=datetime.datetime(2016, 1, 8))
+        entry.categories.append(atom.Category(term))
+        yield entry
+
+
+def test_feed_builder():
+    """Test building sharded feeds."""
+    builder = atom.FeedBuilder(_make_feed, [
+        atom.route_all, atom.route_by_category, atom.paginate(2)])
+    builder.add_entries(_make_entries())
+    assert builder.keys() == [
+        None, ('category', 'sophie'), ('page', 0),
+        ('category', 'firis'), ('page', 1)]
+
+    file = io.StringIO()
+    builder.write(('category', 'sophie'), file)
+    feed = _make_feed(('category', 'sophie'))
+    feed.entries = [entry for entry in _make_entries()
+                    if entry.categories[0].term == 'sophie']
+    expected = io.StringIO()
+    feed.write(expected)
+    assert file.getvalue() == expected.getvalue()
+
+
+def test_feed_builder_continues_index():
+    """Test indexes continue across add_entries() calls."""
+    builder = atom.FeedBuilder(_make_feed, [atom.paginate(2)])
+    entries = list(_make_entries())
+    builder.add_entries(entries[:1])
+    builder.add_entries(entries[1:])
+    assert builder.keys() == [('page', 0), ('page', 1)]
+
+
+def test_feed_builder_write_all():
+    """Test writing all feeds."""
+    builder = atom.FeedBuilder(_make_feed, [atom.route_by_author])
+    entry = next(_make_entries())
+    entry.authors.append(atom.Author('Nene'))
+    builder.add_entries([entry])
+    files = {}
+
+    class _File(io.StringIO):
+
+        def __init__(self, key):
+            super().__init__()
+            self.key = key
+
+        def close(self):
+            files[self.key] = self.getvalue()
+            super().close()
+
+    builder.write_all(_File)
+    assert '<name>Nene</name>' in files[('author', 'Nene')]
@@ -0,0 +1,63 @@
+import jinja2
+
+from mir.frelia import alchemy
+import mir.frelia.depend as depend
+import mir.frelia.page as pagelib
+
+
+def test_stale_templates():
+    graph = depend.DependencyGraph()
+    graph.record('foo', templates=['base.html', 'post.html'])
+    graph.record('bar', templates=['base.html'])
+    assert graph.stale(templates=['post.html']) == {'foo'}
+    assert graph.stale(templates=['base.html']) == {'foo', 'bar'}
+
+
+def test_stale_keys():
+    graph = depend.DependencyGraph()
+    graph.record('foo', names=['site_title'])
+    graph.record('bar', names=['author'])
+    graph.record('baz', names=['sitemap'])
+    assert graph.stale(keys=['site']) == {'foo'}
+    assert graph.stale(keys=['author']) == {'bar'}
+
+
+def test_save_load(tmpdir):
+    graph = depend.DependencyGraph()
+    graph.record('foo', templates=['base.html'], names=['site_title'])
+    graph.save(tmpdir / 'deps')
+    got = depend.DependencyGraph.load(tmpdir / 'deps')
+    assert got.dependencies('foo') == (
+        frozenset(['base.html']), frozenset(['site_title']))
+
+
+def test_load_missing(tmpdir):
+    assert len(depend.DependencyGraph.load(tmpdir / 'deps')) == 0
+
+
+def test_find_template_dependencies():
+    env = jinja2.Environment(loader=jinja2.DictLoader({
+        'base.html': '{% include "header.html" %}{% block body %}'
+                     '{% endblock %}',
+        'header.html': '{% import "macros.html" as macros %}',
+        'macros.html': '',
+        'post.html': '{% extends "base.html" %}',
+        'other.html': '',
+    }))
+    got = depend.find_template_dependencies(env, ['post.html'])
+    assert got == {'post.html', 'base.html', 'header.html', 'macros.html'}
+
+
+def test_template_renderer_used_names():
+    renderer = alchemy.TemplateRenderer({'site': {'title': 'Atelier'}})
+    page = pagelib.BasicPage('foo', '$path $site_title $missing')
+    names = set()
+    assert renderer.render(page, used_names=names) == 'foo Atelier $missing'
+    assert names == {'site_title', 'missing'}
+
+
+def test_jinja_renderer_used_templates(env):
+    renderer = alchemy.JinjaRenderer(env)
+    templates = set()
+    renderer.render(pagelib.BasicPage('foo', 'spam'), used_templates=templates)
+    assert templates == {'base.html'}
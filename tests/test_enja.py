@@ -5,6 +5,7 @@ import io
 import pytest
 
 import mir.frelia.enja as enja
+import mir.frelia.manifest as manifestlib
 
 
 def test_load():
@@ -70,3 +71,142 @@ def test_document_repr():
     doc = enja.Document('girl meets girl')
     doc.header['sophie'] = 'prachta'
     assert repr(doc) == "<Document with header={'sophie': 'prachta'}, body='girl meets girl'>"
+
+
+def test_body_offset():
+    """Test finding the body offset in Enja file data."""
+    data = b'foo: bar\n---\n<p>Hello world!</p>'
+    assert data[enja.body_offset(data):] == b'<p>Hello world!</p>'
+
+
+def test_body_offset_empty_header():
+    """Test finding the body offset with an empty header."""
+    assert enja.body_offset(b'---\nfoo') == 4
+
+
+def test_body_offset_no_divider():
+    """Test finding the body offset without a divider."""
+    assert enja.body_offset(b'foo: bar\n') == 9
+
+
+def test_load_lazily(tmpdir):
+    """Test loading a document lazily."""
+    path = tmpdir / 'doc'
+    path.write_text('foo: bar\n---\n<p>Hello world!</p>')
+    doc = enja.load_lazily(path)
+    assert doc.header == {'foo': 'bar'}
+    assert doc.body_offset == 13
+    assert doc._body is None
+    assert doc.body == '<p>Hello world!</p>'
+
+
+def test_load_lazily_body_only(tmpdir):
+    """Test reading only the body of a lazy document."""
+    path = tmpdir / 'doc'
+    path.write_text('foo: bar\n---\n<p>Hello world!</p>')
+    doc = enja.load_lazily(path)
+    assert doc.body == '<p>Hello world!</p>'
+
+
+def test_load_lazily_equals_load(tmpdir):
+    """Test lazy documents compare equal to loaded documents."""
+    path = tmpdir / 'doc'
+    path.write_text('foo: bar\n---\n<p>Hello world!</p>')
+    with open(str(path)) as file:
+        doc = enja.load(file)
+    assert enja.load_lazily(path) == doc
+
+
+@pytest.mark.parametrize('data', [
+    b'foo: bar\r\n---\r\n<p>Hello world!</p>\r\n',
+    b'foo: bar\r---\r<p>Hello world!</p>\r',
+])
+def test_load_lazily_newlines(tmpdir, data):
+    """Test loading a document lazily with other newline endings."""
+    path = tmpdir / 'doc'
+    path.write_bytes(data)
+    doc = enja.load_lazily(path)
+    with open(str(path)) as file:
+        expected = enja.load(file)
+    assert doc.header == {'foo': 'bar'}
+    assert doc.body == '<p>Hello world!</p>\n'
+    assert doc == expected
+
+
+@pytest.mark.parametrize('data', [
+    b'foo: bar\n---\n<p>Hello world!</p>',
+    b'---\n<p>Hello world!</p>\n---\n',
+    b'foo: bar\n',
+    b'',
+    b'foo: bar\r\n---\r\nbaz\r\n',
+    b'foo: bar\r---\rbaz\r',
+])
+def test_load_bytes_matches_text(data):
+    """Test loading bytes matches loading text."""
+    text_file = io.TextIOWrapper(io.BytesIO(data))
+    assert enja.load.load_bytes(data) == enja.load(text_file)
+
+
+def test_load_binary_file():
+    """Test loading a binary file."""
+    file = io.BytesIO(b'foo: bar\n---\n<p>Hello world!</p>')
+    doc = enja.load(file)
+    assert doc.header == {'foo': 'bar'}
+    assert doc.body == '<p>Hello world!</p>'
+
+
+def test_caching_loader(tmpdir):
+    """Test loading documents using cached headers."""
+    path = tmpdir / 'doc'
+    path.write_text('foo: bar\n---\n<p>Hello world!</p>')
+    manifest = manifestlib.Manifest()
+    enja.build_header_cache([path], manifest)
+    manifest.set(path, manifest.get(path)._replace(header={'foo': 'baz'}))
+    loader = enja.CachingLoader(enja.Document, manifest)
+    with open(str(path), 'rb') as file:
+        doc = loader(file)
+    assert doc.header == {'foo': 'baz'}
+    assert doc.body == '<p>Hello world!</p>'
+
+
+def test_caching_loader_stale(tmpdir):
+    """Test loading documents with stale cached headers."""
+    path = tmpdir / 'doc'
+    path.write_text('foo: bar\n---\n<p>Hello world!</p>')
+    manifest = manifestlib.Manifest()
+    enja.build_header_cache([path], manifest)
+    path.write_text('foo: spam\n---\n<p>Hello world!</p>')
+    loader = enja.CachingLoader(enja.Document, manifest)
+    with open(str(path), 'rb') as file:
+        doc = loader(file)
+    assert doc.header == {'foo': 'spam'}
+    assert manifest.get(path).header == {'foo': 'spam'}
+
+
+def test_caching_loader_crlf(tmpdir):
+    """Test loading CRLF documents using cached headers."""
+    path = tmpdir / 'doc'
+    path.write_bytes(b'foo: bar\r\n---\r\n<p>Hello world!</p>\r\n')
+    manifest = manifestlib.Manifest()
+    enja.build_header_cache([path], manifest)
+    loader = enja.CachingLoader(enja.Document, manifest)
+    with open(str(path), 'rb') as file:
+        doc = loader(file)
+    assert doc.header == {'foo': 'bar'}
+    assert doc.body == '<p>Hello world!</p>\n'
+
+
+def test_caching_loader_touched(tmpdir):
+    """Test loading touched documents compares content hashes."""
+    path = tmpdir / 'doc'
+    path.write_text('foo: bar\n---\n<p>Hello world!</p>')
+    manifest = manifestlib.Manifest()
+    enja.build_header_cache([path], manifest)
+    manifest.set(path, manifest.get(path)._replace(
+        mtime_ns=0, header={'foo': 'baz'}))
+    loader = enja.CachingLoader(enja.Document, manifest)
+    with open(str(path), 'rb') as file:
+        doc, changed = loader.load_file(file, path)
+    assert not changed
+    assert doc.header == {'foo': 'baz'}
+    assert manifest.get(path).mtime_ns == path.stat().st_mtime_ns
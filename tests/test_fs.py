@@ -1,10 +1,13 @@
 import collections
+import errno
 import os
 import pathlib
+from unittest import mock
 
 import pytest
 
 import mir.frelia.fs as fslib
+import mir.frelia.manifest as manifestlib
 
 
 def test_find_files(tmpdir):
@@ -27,3 +30,155 @@ def test_make_parents(tmpdir):
     fslib.make_parents(tmpdir / 'spam/eggs/ham')
     assert (tmpdir / 'spam/eggs').is_dir()
     assert not (tmpdir / 'spam/eggs/ham').exists()
+
+
+def test_link_recursively_stats(tmpdir):
+    (tmpdir / 'src/spam').mkdir(parents=True)
+    (tmpdir / 'src/spam/eggs').touch()
+    (tmpdir / 'src/ham').touch()
+    (tmpdir / 'src/empty').mkdir()
+    stats = fslib.link_recursively(tmpdir / 'src', tmpdir / 'dst')
+    assert stats.linked == 2
+    assert stats.directories == 2
+    assert not (tmpdir / 'dst/empty').exists()
+
+
+def test_link_recursively_existing(tmpdir):
+    (tmpdir / 'src').mkdir()
+    (tmpdir / 'src/eggs').touch()
+    fslib.link_recursively(tmpdir / 'src', tmpdir / 'dst')
+    with pytest.raises(FileExistsError):
+        fslib.link_recursively(tmpdir / 'src', tmpdir / 'dst')
+
+
+def test_link_recursively_sync(tmpdir):
+    (tmpdir / 'src').mkdir()
+    (tmpdir / 'src/eggs').touch()
+    (tmpdir / 'src/spam').write_text('spam')
+    (tmpdir / 'dst').mkdir()
+    (tmpdir / 'dst/spam').write_text('ham and eggs')
+    stats = fslib.link_recursively(tmpdir / 'src', tmpdir / 'dst', sync=True)
+    assert stats.linked == 2
+    assert (tmpdir / 'src/spam').samefile(tmpdir / 'dst/spam')
+    stats = fslib.link_recursively(tmpdir / 'src', tmpdir / 'dst', sync=True)
+    assert stats.skipped == 2
+    assert stats.linked == 0
+
+
+def test_link_recursively_cross_device(tmpdir):
+    (tmpdir / 'src').mkdir()
+    (tmpdir / 'src/eggs').write_text('spam')
+    error = OSError(errno.EXDEV, 'Invalid cross-device link')
+    with mock.patch('os.link', side_effect=error):
+        stats = fslib.link_recursively(tmpdir / 'src', tmpdir / 'dst')
+    assert stats.copied == 1
+    assert (tmpdir / 'dst/eggs').read_text() == 'spam'
+
+
+def test_link_recursively_symlink_cycle(tmpdir):
+    (tmpdir / 'src').mkdir()
+    (tmpdir / 'src/eggs').touch()
+    (tmpdir / 'src/loop').symlink_to(tmpdir / 'src')
+    stats = fslib.link_recursively(tmpdir / 'src', tmpdir / 'dst')
+    assert stats.linked == 1
+    assert not (tmpdir / 'dst/loop').exists()
+
+
+def test_find_files_filters(tmpdir):
+    (tmpdir / '.git').mkdir()
+    (tmpdir / '.git/config').touch()
+    (tmpdir / 'blog').mkdir()
+    (tmpdir / 'blog/post.html').touch()
+    (tmpdir / 'blog/post.html~').touch()
+    (tmpdir / 'blog/draft.html').touch()
+    got = set(fslib.find_files(tmpdir, include=['*.html'],
+                               exclude=['draft*'],
+                               prune=fslib.PRUNE_HIDDEN))
+    assert got == {tmpdir / 'blog/post.html'}
+
+
+def test_find_files_missing(tmpdir):
+    assert list(fslib.find_files(tmpdir / 'missing')) == []
+
+
+def test_find_files_unreadable_directory(tmpdir):
+    (tmpdir / 'foo').mkdir()
+    (tmpdir / 'foo/spam').touch()
+    (tmpdir / 'bar').touch()
+    scandir = os.scandir
+
+    def fake_scandir(path):
+        if path == str(tmpdir / 'foo'):
+            raise PermissionError(errno.EACCES, 'Permission denied', path)
+        return scandir(path)
+
+    with mock.patch('os.scandir', fake_scandir):
+        got = list(fslib.find_files(tmpdir))
+    assert got == [tmpdir / 'bar']
+
+
+def test_scan_files_stat_str(tmpdir):
+    (tmpdir / 'foo').write_text('spam')
+    got = list(fslib.scan_files(tmpdir, with_stat=True, as_str=True))
+    assert len(got) == 1
+    path, stat = got[0]
+    assert path == str(tmpdir / 'foo')
+    assert stat.st_size == 4
+
+
+def test_write_outputs(tmpdir):
+    manifest = manifestlib.Manifest()
+    stats = fslib.write_outputs(
+        tmpdir, [('foo/index.html', 'spam'), ('bar.css', b'eggs')], manifest)
+    assert stats.written == 2
+    assert (tmpdir / 'foo/index.html').read_text() == 'spam'
+    assert (tmpdir / 'bar.css').read_bytes() == b'eggs'
+
+
+def test_write_outputs_unchanged(tmpdir):
+    manifest = manifestlib.Manifest()
+    fslib.write_outputs(tmpdir, [('foo/index.html', 'spam')], manifest)
+    mtime = (tmpdir / 'foo/index.html').stat().st_mtime_ns
+    stats = fslib.write_outputs(
+        tmpdir, [('foo/index.html', 'spam')], manifest)
+    assert stats.skipped == 1
+    assert (tmpdir / 'foo/index.html').stat().st_mtime_ns == mtime
+
+
+def test_write_outputs_changed(tmpdir):
+    manifest = manifestlib.Manifest()
+    fslib.write_outputs(tmpdir, [('foo/index.html', 'spam')], manifest)
+    stats = fslib.write_outputs(
+        tmpdir, [('foo/index.html', 'eggs')], manifest)
+    assert stats.written == 1
+    assert (tmpdir / 'foo/index.html').read_text() == 'eggs'
+
+
+def test_write_outputs_existing_without_manifest(tmpdir):
+    (tmpdir / 'index.html').write_text('spam')
+    manifest = manifestlib.Manifest()
+    stats = fslib.write_outputs(tmpdir, [('index.html', 'spam')], manifest)
+    assert stats.skipped == 1
+    assert 'index.html' in manifest
+
+
+def test_write_outputs_modified_externally(tmpdir):
+    manifest = manifestlib.Manifest()
+    fslib.write_outputs(tmpdir, [('index.html', 'spam')], manifest)
+    (tmpdir / 'index.html').write_text('ham and eggs')
+    stats = fslib.write_outputs(tmpdir, [('index.html', 'spam')], manifest)
+    assert stats.written == 1
+    assert (tmpdir / 'index.html').read_text() == 'spam'
+
+
+def test_write_outputs_bounded(tmpdir):
+    manifest = manifestlib.Manifest()
+
+    def outputs():
+        for i in range(10):
+            written = len(os.listdir(str(tmpdir)))
+            assert written >= i - 2
+            yield '{}.html'.format(i), 'spam'
+
+    stats = fslib.write_outputs(tmpdir, outputs(), manifest, max_pending=2)
+    assert stats.written == 10
@@ -0,0 +1,107 @@
+import datetime
+
+import pytest
+
+import mir.frelia.index as indexlib
+import mir.frelia.manifest as manifestlib
+
+
+@pytest.fixture
+def index():
+    with indexlib.MetadataIndex() as index:
+        index.update('blog/2016/01/02/sophie', {
+            'title': 'Sophie', 'tags': ['atelier', 'alchemy'],
+            'author': {'name': 'Plachta'}})
+        index.update('blog/firis', {
+            'title': 'Firis', 'tags': 'atelier',
+            'date': datetime.date(2017, 3, 4), 'author': 'Lydie'})
+        index.update('blog/sue', {'title': 'Sue', 'draft': True})
+        yield index
+
+
+def test_query_all(index):
+    got = index.query()
+    assert [result.path for result in got] == [
+        'blog/firis', 'blog/2016/01/02/sophie', 'blog/sue']
+    assert got[0].date == datetime.date(2017, 3, 4)
+    assert got[0].header['title'] == 'Firis'
+
+
+def test_query_tag(index):
+    got = index.query(tag='alchemy')
+    assert [result.path for result in got] == ['blog/2016/01/02/sophie']
+
+
+def test_query_author(index):
+    got = index.query(author='Plachta')
+    assert [result.path for result in got] == ['blog/2016/01/02/sophie']
+
+
+def test_query_date_range(index):
+    got = index.query(start=datetime.date(2016, 1, 1),
+                      end=datetime.date(2016, 12, 31))
+    assert [result.path for result in got] == ['blog/2016/01/02/sophie']
+
+
+def test_query_fields(index):
+    got = index.query(fields={'draft': True})
+    assert [result.path for result in got] == ['blog/sue']
+
+
+def test_query_paginated(index):
+    got = index.query(tag='atelier', descending=False, limit=1, offset=1)
+    assert [result.path for result in got] == ['blog/firis']
+
+
+def test_query_invalid_order(index):
+    with pytest.raises(ValueError):
+        index.query(order='title; DROP TABLE pages')
+
+
+def test_tags(index):
+    assert index.tags() == [('alchemy', 1), ('atelier', 2)]
+
+
+def test_remove(index):
+    index.remove('blog/firis')
+    assert len(index) == 2
+    assert index.tags() == [('alchemy', 1), ('atelier', 1)]
+
+
+def test_update_null_tags(index):
+    index.update('blog/lydie', {'title': 'Lydie', 'tags': None})
+    assert index.query(fields={'title': 'Lydie'})[0].path == 'blog/lydie'
+    assert index.tags() == [('alchemy', 1), ('atelier', 2)]
+
+
+def _entry(mtime_ns, header):
+    return manifestlib.Entry(mtime_ns=mtime_ns, size=0, digest='',
+                             header=header, body_offset=0)
+
+
+def test_sync():
+    manifest = manifestlib.Manifest()
+    manifest.set('foo', _entry(1, {'tags': ['spam']}))
+    manifest.set('bar', _entry(1, {'tags': ['eggs']}))
+    with indexlib.MetadataIndex() as index:
+        assert index.sync(manifest) == 2
+        manifest.set('foo', _entry(2, {'tags': ['ham']}))
+        manifest.discard('bar')
+        assert index.sync(manifest) == 1
+        assert index.tags() == [('ham', 1)]
+
+
+def test_sync_ignores_output_entries():
+    manifest = manifestlib.Manifest()
+    manifest.set('foo', _entry(1, {'tags': ['spam']}))
+    manifest.set('foo.html', _entry(1, None))
+    with indexlib.MetadataIndex() as index:
+        assert index.sync(manifest) == 1
+        assert [result.path for result in index.query()] == ['foo']
+
+
+def test_persistent(tmpdir):
+    with indexlib.MetadataIndex(tmpdir / 'index.sqlite') as index:
+        index.update('foo', {'title': 'Foo'})
+    with indexlib.MetadataIndex(tmpdir / 'index.sqlite') as index:
+        assert len(index) == 1
@@ -0,0 +1,70 @@
+import io
+import json
+
+import mir.frelia.instrument as instrument
+import mir.frelia.page as pagelib
+
+
+def test_record_summary():
+    stats = instrument.Stats(slowest=2)
+    stats.record('render', 1.0, 'foo', bytes_written=3)
+    stats.record('render', 3.0, 'bar', bytes_written=4)
+    stats.record('render', 2.0, 'baz')
+    got = stats.summary()['render']
+    assert got['count'] == 3
+    assert got['total'] == 6.0
+    assert got['p50'] == 2.0
+    assert got['max'] == 3.0
+    assert got['bytes_written'] == 7
+    assert got['slowest'] == [(3.0, 'bar'), (2.0, 'baz')]
+
+
+def test_timed():
+    stats = instrument.Stats()
+    render = stats.timed('render', lambda page: page.content,
+                         output_bytes=True)
+    assert render(pagelib.BasicPage('foo', 'spam')) == 'spam'
+    got = stats.summary()['render']
+    assert got['count'] == 1
+    assert got['bytes_written'] == 4
+    assert got['slowest'][0][1] == 'foo'
+
+
+def test_timed_non_ascii():
+    stats = instrument.Stats()
+    render = stats.timed('render', lambda page: page.content,
+                         output_bytes=True)
+    render(pagelib.BasicPage('foo', 'ソフィー'))
+    assert stats.summary()['render']['bytes_written'] == 12
+
+
+def test_timed_iter():
+    stats = instrument.Stats()
+    pages = [pagelib.BasicPage('foo', 'spam'), pagelib.BasicPage('bar', '')]
+    assert list(stats.timed_iter('load', pages)) == pages
+    assert stats.summary()['load']['count'] == 2
+
+
+def test_measure():
+    stats = instrument.Stats()
+    with stats.measure('write', bytes_read=5):
+        pass
+    assert stats.summary()['write']['bytes_read'] == 5
+
+
+def test_dump_json():
+    stats = instrument.Stats()
+    stats.record('render', 1.0, 'foo')
+    file = io.StringIO()
+    stats.dump_json(file)
+    got = json.loads(file.getvalue())
+    assert got['render']['slowest'] == [[1.0, 'foo']]
+
+
+def test_report():
+    stats = instrument.Stats()
+    stats.record('render', 1.0, 'foo')
+    file = io.StringIO()
+    stats.report(file)
+    assert 'render' in file.getvalue()
+    assert 'foo' in file.getvalue()
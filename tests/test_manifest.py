@@ -0,0 +1,46 @@
+import mir.frelia.manifest as manifestlib
+
+
+def _entry():
+    return manifestlib.Entry(
+        mtime_ns=1, size=2, digest='abc',
+        header={'sophie': 'prachta'}, body_offset=16)
+
+
+def test_manifest_save_load(tmpdir):
+    manifest = manifestlib.Manifest()
+    manifest.set('foo/bar', _entry())
+    manifest.save(tmpdir / 'manifest')
+    got = manifestlib.Manifest.load(tmpdir / 'manifest')
+    assert got.get('foo/bar') == _entry()
+
+
+def test_manifest_load_missing(tmpdir):
+    got = manifestlib.Manifest.load(tmpdir / 'manifest')
+    assert len(got) == 0
+
+
+def test_manifest_discard():
+    manifest = manifestlib.Manifest()
+    manifest.set('foo/bar', _entry())
+    manifest.discard('foo/bar')
+    assert 'foo/bar' not in manifest
+
+
+def test_changes_changed():
+    changes = manifestlib.Changes()
+    changes.added.add('foo')
+    changes.modified.add('bar')
+    assert changes.changed == {'foo', 'bar'}
+    assert changes
+
+
+def test_save_state_replaces_atomically(tmpdir):
+    manifestlib.save_state(tmpdir / 'state', {'foo': 1})
+    manifestlib.save_state(tmpdir / 'state', {'foo': 2})
+    assert manifestlib.load_state(tmpdir / 'state', None) == {'foo': 2}
+    assert not (tmpdir / 'state.tmp').exists()
+
+
+def test_load_state_missing(tmpdir):
+    assert manifestlib.load_state(tmpdir / 'state', []) == []
@@ -1,4 +1,14 @@
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from unittest import mock
+
+import pytest
+
 import mir.frelia.enja as enja
+import mir.frelia.manifest as manifestlib
 import mir.frelia.page as pagelib
 
 
@@ -20,3 +30,202 @@ def test_load_pages(tmpdir):
     assert len(got) == 1
     assert got[0].path == tmpdir/'file'
     assert got[0].content == 'firis'
+
+
+def test_load_pages_incrementally(tmpdir):
+    (tmpdir / 'file').write_text('sophie: prachta\n---\nfiris')
+    manifest = manifestlib.Manifest()
+    got = list(pagelib.load_pages_incrementally(tmpdir, manifest))
+    assert len(got) == 1
+    assert got[0].path == tmpdir/'file'
+    assert got[0].content == 'firis'
+    assert manifest.changes.added == {str(tmpdir/'file')}
+    assert manifest.get(tmpdir/'file').header == {'sophie': 'prachta'}
+
+
+def test_load_pages_incrementally_unchanged(tmpdir):
+    (tmpdir / 'file').write_text('sophie: prachta\n---\nfiris')
+    manifest = manifestlib.Manifest()
+    list(pagelib.load_pages_incrementally(tmpdir, manifest))
+    got = list(pagelib.load_pages_incrementally(tmpdir, manifest))
+    assert got[0].content == 'firis'
+    assert not manifest.changes
+
+
+def test_load_pages_incrementally_modified(tmpdir):
+    filepath = tmpdir / 'file'
+    filepath.write_text('sophie: prachta\n---\nfiris')
+    manifest = manifestlib.Manifest()
+    list(pagelib.load_pages_incrementally(tmpdir, manifest))
+    filepath.write_text('sophie: prachta\n---\nlydie')
+    got = list(pagelib.load_pages_incrementally(tmpdir, manifest))
+    assert got[0].content == 'lydie'
+    assert manifest.changes.modified == {str(filepath)}
+
+
+def test_load_pages_incrementally_touched(tmpdir):
+    filepath = tmpdir / 'file'
+    filepath.write_text('sophie: prachta\n---\nfiris')
+    manifest = manifestlib.Manifest()
+    list(pagelib.load_pages_incrementally(tmpdir, manifest))
+    stat = filepath.stat()
+    os.utime(str(filepath), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    got = list(pagelib.load_pages_incrementally(tmpdir, manifest))
+    assert got[0].content == 'firis'
+    assert not manifest.changes
+
+
+def test_load_pages_incrementally_deleted(tmpdir):
+    filepath = tmpdir / 'file'
+    filepath.write_text('sophie: prachta\n---\nfiris')
+    manifest = manifestlib.Manifest()
+    list(pagelib.load_pages_incrementally(tmpdir, manifest))
+    filepath.unlink()
+    got = list(pagelib.load_pages_incrementally(tmpdir, manifest))
+    assert got == []
+    assert manifest.changes.deleted == {str(filepath)}
+    assert filepath not in manifest
+
+
+def test_load_pages_incrementally_deleted_unnormalized_root(
+        tmpdir, monkeypatch):
+    (tmpdir / 'content').mkdir()
+    filepath = tmpdir / 'content' / 'file'
+    filepath.write_text('sophie: prachta\n---\nfiris')
+    manifest = manifestlib.Manifest()
+    monkeypatch.chdir(str(tmpdir))
+    list(pagelib.load_pages_incrementally('./content', manifest))
+    filepath.unlink()
+    list(pagelib.load_pages_incrementally('./content', manifest))
+    assert manifest.changes.deleted == {os.path.join('content', 'file')}
+    assert len(manifest) == 0
+
+
+def test_load_pages_incrementally_crlf(tmpdir):
+    (tmpdir / 'file').write_bytes(
+        b'sophie: prachta\r\n---\r\nfiris\r\n')
+    manifest = manifestlib.Manifest()
+    cold = list(pagelib.load_pages_incrementally(tmpdir, manifest))
+    warm = list(pagelib.load_pages_incrementally(tmpdir, manifest))
+    assert [page.content for page in cold] == ['firis\n']
+    assert [page.content for page in warm] == ['firis\n']
+
+
+def test_load_pages_in_parallel(tmpdir):
+    for name in ('a', 'b', 'c'):
+        (tmpdir / name).write_text('sophie: prachta\n---\n' + name)
+    got = list(pagelib.load_pages_in_parallel(
+        tmpdir, processes=2, chunksize=1))
+    expected = [page.path for page in pagelib.load_pages(tmpdir)]
+    assert [page.path for page in got] == expected
+    assert sorted(page.content for page in got) == ['a', 'b', 'c']
+
+
+def test_load_pages_in_parallel_unordered(tmpdir):
+    for name in ('a', 'b', 'c'):
+        (tmpdir / name).write_text('sophie: prachta\n---\n' + name)
+    got = pagelib.load_pages_in_parallel(tmpdir, processes=2, ordered=False)
+    assert sorted(page.content for page in got) == ['a', 'b', 'c']
+
+
+def test_load_pages_filtered(tmpdir):
+    (tmpdir / 'file.html').write_text('sophie: prachta\n---\nfiris')
+    (tmpdir / 'file.html~').write_text('sophie: prachta\n---\nlydie')
+    got = list(pagelib.load_pages(tmpdir, exclude=['*~']))
+    assert [page.content for page in got] == ['firis']
+
+
+def test_load_pages_in_parallel_filtered(tmpdir):
+    (tmpdir / 'file.html').write_text('sophie: prachta\n---\nfiris')
+    (tmpdir / 'file.html~').write_text('sophie: prachta\n---\nlydie')
+    got = pagelib.load_pages_in_parallel(tmpdir, processes=2, exclude=['*~'])
+    assert [page.content for page in got] == ['firis']
+
+
+def test_load_pages_incrementally_filtered(tmpdir):
+    (tmpdir / '.git').mkdir()
+    (tmpdir / '.git/config').write_text('[core]')
+    (tmpdir / 'file').write_text('sophie: prachta\n---\nfiris')
+    manifest = manifestlib.Manifest()
+    got = list(pagelib.load_pages_incrementally(
+        tmpdir, manifest, prune=['.git']))
+    assert [page.content for page in got] == ['firis']
+    assert len(manifest) == 1
+
+
+def _collect_async(async_iterable):
+    async def collect():
+        return [item async for item in async_iterable]
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(collect())
+    finally:
+        loop.close()
+
+
+def test_load_pages_async(tmpdir):
+    for name in ('a', 'b', 'c'):
+        (tmpdir / name).write_text('sophie: prachta\n---\n' + name)
+    got = _collect_async(pagelib.load_pages_async(tmpdir, concurrency=2))
+    assert sorted(page.content for page in got) == ['a', 'b', 'c']
+    assert sorted(page.path for page in got) == [
+        tmpdir / name for name in ('a', 'b', 'c')]
+
+
+def test_load_pages_async_concurrent(tmpdir):
+    for i in range(8):
+        (tmpdir / str(i)).write_text('sophie: prachta\n---\nfiris')
+
+    lock = threading.Lock()
+    in_progress = 0
+    peak = 0
+
+    def slow_read_file(filepath):
+        nonlocal in_progress, peak
+        with lock:
+            in_progress += 1
+            peak = max(peak, in_progress)
+        time.sleep(0.1)
+        with lock:
+            in_progress -= 1
+        return filepath.read_bytes()
+
+    loader = pagelib._AsyncLoader(pagelib.BasicPage, enja.load,
+                                  slow_read_file)
+    executor = concurrent.futures.ThreadPoolExecutor(8)
+    got = _collect_async(loader(tmpdir, concurrency=8, executor=executor))
+    executor.shutdown()
+    assert len(got) == 8
+    assert peak > 1
+
+
+def test_load_pages_async_reads_during_walk(tmpdir):
+    (tmpdir / 'a').write_text('sophie: prachta\n---\na')
+    (tmpdir / 'b').write_text('sophie: prachta\n---\nb')
+    read_started = threading.Event()
+    walk_waited = []
+
+    def find_files(rootdir, **find_options):
+        yield tmpdir / 'a'
+        walk_waited.append(read_started.wait(5))
+        yield tmpdir / 'b'
+
+    def read_file(filepath):
+        read_started.set()
+        return filepath.read_bytes()
+
+    loader = pagelib._AsyncLoader(pagelib.BasicPage, enja.load, read_file)
+    with mock.patch.object(pagelib.fslib, 'find_files', find_files):
+        got = _collect_async(loader(tmpdir))
+    assert walk_waited == [True]
+    assert sorted(page.content for page in got) == ['a', 'b']
+
+
+def test_load_pages_async_walk_error(tmpdir):
+    def find_files(rootdir, **find_options):
+        raise FileNotFoundError(rootdir)
+        yield
+
+    with mock.patch.object(pagelib.fslib, 'find_files', find_files):
+        with pytest.raises(FileNotFoundError):
+            _collect_async(pagelib.load_pages_async(tmpdir))
@@ -0,0 +1,122 @@
+import jinja2
+import pytest
+
+import mir.frelia.alchemy as alchemy
+import mir.frelia.page as pagelib
+import mir.frelia.rendercache as rendercache
+
+
+def test_fingerprint_order_independent():
+    assert (rendercache.fingerprint({'a': 1, 'b': {2, 3}})
+            == rendercache.fingerprint({'b': {3, 2}, 'a': 1}))
+
+
+def test_render_cache_get_put(tmpdir):
+    cache = rendercache.RenderCache(tmpdir)
+    assert cache.get('abcd') is None
+    cache.put('abcd', 'spam')
+    assert cache.get('abcd') == 'spam'
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+
+def test_render_cache_persistent(tmpdir):
+    rendercache.RenderCache(tmpdir).put('abcd', 'spam')
+    cache = rendercache.RenderCache(tmpdir)
+    assert len(cache) == 1
+    assert cache.stats.bytes == 4
+    assert cache.get('abcd') == 'spam'
+
+
+def test_render_cache_evicts_lru(tmpdir):
+    cache = rendercache.RenderCache(tmpdir, max_bytes=8)
+    cache.put('aaaa', 'spam')
+    cache.put('bbbb', 'eggs')
+    cache.get('aaaa')
+    cache.put('cccc', 'hams')
+    assert cache.get('bbbb') is None
+    assert cache.get('aaaa') == 'spam'
+    assert cache.stats.evictions == 1
+
+
+class _CountingRenderer(alchemy.TemplateRenderer):
+
+    def __init__(self, base_mapping):
+        super().__init__(base_mapping)
+        self.calls = 0
+
+    def render(self, page):
+        self.calls += 1
+        return super().render(page)
+
+
+def test_cached_renderer(tmpdir):
+    cache = rendercache.RenderCache(tmpdir)
+    renderer = _CountingRenderer({'site': 'Atelier'})
+    cached = rendercache.CachedRenderer(renderer, cache)
+    page = pagelib.BasicPage('foo', '$path $site')
+    assert cached.render(page) == 'foo Atelier'
+    assert cached.render(page) == 'foo Atelier'
+    assert renderer.calls == 1
+
+
+def test_cached_renderer_base_mapping_changed(tmpdir):
+    cache = rendercache.RenderCache(tmpdir)
+    page = pagelib.BasicPage('foo', '$site')
+    renderer = alchemy.TemplateRenderer({'site': 'Atelier'})
+    rendercache.CachedRenderer(renderer, cache).render(page)
+    renderer = alchemy.TemplateRenderer({'site': 'Sophie'})
+    got = rendercache.CachedRenderer(renderer, cache).render(page)
+    assert got == 'Sophie'
+
+
+def _jinja_renderer(templates):
+    env = jinja2.Environment(loader=jinja2.DictLoader(templates))
+    return alchemy.JinjaRenderer(env)
+
+
+def test_cached_jinja_renderer_template_changed(tmpdir):
+    cache = rendercache.RenderCache(tmpdir)
+    page = pagelib.BasicPage('foo', 'spam')
+    renderer = _jinja_renderer({
+        'base.html': '{% include "inc.html" %}{{ content }}',
+        'inc.html': '<p>',
+    })
+    cached = rendercache.CachedRenderer(renderer, cache)
+    assert cached.render(page) == '<p>spam'
+    renderer = _jinja_renderer({
+        'base.html': '{% include "inc.html" %}{{ content }}',
+        'inc.html': '<div>',
+    })
+    cached = rendercache.CachedRenderer(renderer, cache)
+    assert cached.render(page) == '<div>spam'
+    assert cache.stats.hits == 0
+
+
+def test_fingerprint_rejects_unstable_values():
+    with pytest.raises(TypeError):
+        rendercache.fingerprint({'a': object()})
+
+
+def test_cached_renderer_used_names(tmpdir):
+    cache = rendercache.RenderCache(tmpdir)
+    renderer = alchemy.TemplateRenderer({'site': 'Atelier'})
+    cached = rendercache.CachedRenderer(renderer, cache)
+    page = pagelib.BasicPage('foo', '$path $site')
+    for _ in range(2):
+        used_names = set()
+        assert cached.render(page, used_names=used_names) == 'foo Atelier'
+        assert used_names == {'site'}
+    assert cache.stats.hits == 1
+
+
+def test_cached_jinja_renderer_used_templates(tmpdir):
+    cache = rendercache.RenderCache(tmpdir)
+    renderer = _jinja_renderer({'base.html': '{{ content }}'})
+    cached = rendercache.CachedRenderer(renderer, cache)
+    page = pagelib.BasicPage('foo', 'spam')
+    for _ in range(2):
+        used_templates = set()
+        assert cached.render(page, used_templates=used_templates) == 'spam'
+        assert used_templates == {'base.html'}
+    assert cache.stats.hits == 1
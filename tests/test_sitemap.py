@@ -1,5 +1,7 @@
 import datetime
+import gzip
 import io
+import xml.etree.ElementTree as ET
 
 import pytest
 
@@ -78,3 +80,66 @@ def test_render():
         '<url><loc>http://localhost/</loc><lastmod>2010-01-02</lastmod>'
         '<changefreq>daily</changefreq><priority>0.7</priority></url>'
         '</urlset>')
+
+
+def test_render_generator():
+    """Test rendering a sitemap urlset from a generator."""
+    urls = (sitemap.URL('http://localhost/{}'.format(i)) for i in range(2))
+    file = io.StringIO()
+    sitemap.write_sitemap_urlset(file, urls)
+    assert file.getvalue().endswith(
+        '<url><loc>http://localhost/0</loc></url>'
+        '<url><loc>http://localhost/1</loc></url>'
+        '</urlset>')
+
+
+def test_render_declares_file_encoding(tmpdir):
+    path = tmpdir / 'sitemap.xml'
+    with open(str(path), 'w', encoding='latin-1') as file:
+        sitemap.write_sitemap_urlset(
+            file, [sitemap.URL('http://localhost/café')])
+    root = ET.parse(str(path)).getroot()
+    loc = root.find('{http://www.sitemaps.org/schemas/sitemap/0.9}url/'
+                    '{http://www.sitemaps.org/schemas/sitemap/0.9}loc')
+    assert loc.text == 'http://localhost/café'
+
+
+def test_write_sitemap_index():
+    file = io.StringIO()
+    sitemap.write_sitemap_index(file, ['http://localhost/sitemap-1.xml'])
+    assert file.getvalue() == (
+        "<?xml version='1.0' encoding='UTF-8'?>\n"
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        '<sitemap><loc>http://localhost/sitemap-1.xml</loc></sitemap>'
+        '</sitemapindex>')
+
+
+def test_write_sitemaps_max_urls(tmpdir):
+    urls = (sitemap.URL('http://localhost/{}'.format(i)) for i in range(5))
+    got = sitemap.write_sitemaps(tmpdir, 'http://localhost/', urls,
+                                 max_urls=2)
+    assert [path.name for path in got] == [
+        'sitemap-1.xml', 'sitemap-2.xml', 'sitemap-3.xml']
+    assert (tmpdir / 'sitemap-3.xml').read_text().count('<url>') == 1
+    index = (tmpdir / 'sitemap.xml').read_text()
+    assert '<loc>http://localhost/sitemap-3.xml</loc>' in index
+
+
+def test_write_sitemaps_max_bytes(tmpdir):
+    urls = [sitemap.URL('http://localhost/{}'.format(i)) for i in range(3)]
+    file = io.StringIO()
+    sitemap.write_sitemap_urlset(file, urls[:2])
+    max_bytes = len(file.getvalue().encode())
+    got = sitemap.write_sitemaps(tmpdir, 'http://localhost/', urls,
+                                 max_bytes=max_bytes)
+    assert len(got) == 2
+    assert (tmpdir / 'sitemap-1.xml').read_text() == file.getvalue()
+
+
+def test_write_sitemaps_compress(tmpdir):
+    urls = [sitemap.URL('http://localhost/')]
+    got = sitemap.write_sitemaps(tmpdir, 'http://localhost/', urls,
+                                 compress=True)
+    assert [path.name for path in got] == ['sitemap-1.xml.gz']
+    with gzip.open(str(got[0]), 'rt', encoding='utf-8') as file:
+        assert '<loc>http://localhost/</loc>' in file.read()
@@ -0,0 +1,66 @@
+import mir.frelia.page as pagelib
+import mir.frelia.watch as watchlib
+
+
+def test_watcher_poll(tmpdir):
+    (tmpdir / 'foo').write_text('sophie: prachta\n---\nfiris')
+    watcher = watchlib.Watcher(tmpdir)
+    changes, pages = watcher.poll()
+    assert changes.added == {str(tmpdir / 'foo')}
+    assert [page.content for page in pages] == ['firis']
+
+
+def test_watcher_poll_unchanged(tmpdir):
+    (tmpdir / 'foo').write_text('sophie: prachta\n---\nfiris')
+    watcher = watchlib.Watcher(tmpdir)
+    watcher.poll()
+    changes, pages = watcher.poll()
+    assert not changes
+    assert pages == []
+
+
+def test_watcher_poll_changes(tmpdir):
+    (tmpdir / 'foo').write_text('sophie: prachta\n---\nfiris')
+    (tmpdir / 'bar').write_text('sophie: prachta\n---\nfiris')
+    watcher = watchlib.Watcher(tmpdir)
+    watcher.poll()
+    (tmpdir / 'foo').write_text('sophie: prachta\n---\nlydie and sue')
+    (tmpdir / 'bar').unlink()
+    (tmpdir / 'baz').write_text('sophie: prachta\n---\nsue')
+    changes, pages = watcher.poll()
+    assert changes.added == {str(tmpdir / 'baz')}
+    assert changes.modified == {str(tmpdir / 'foo')}
+    assert changes.deleted == {str(tmpdir / 'bar')}
+    assert [page.content for page in pages] == ['sue', 'lydie and sue']
+
+
+def test_watcher_watch(tmpdir):
+    (tmpdir / 'foo').write_text('sophie: prachta\n---\nfiris')
+    watcher = watchlib.Watcher(tmpdir)
+    changes, pages = next(watcher.watch(interval=0))
+    assert changes.added == {str(tmpdir / 'foo')}
+
+
+def test_watcher_poll_load_error(tmpdir):
+    (tmpdir / 'foo').write_text('sophie: [prachta\n---\nfiris')
+    watcher = watchlib.Watcher(tmpdir)
+    changes, pages = watcher.poll()
+    assert not changes
+    assert pages == []
+    (tmpdir / 'foo').write_text('sophie: prachta\n---\nfiris')
+    changes, pages = watcher.poll()
+    assert changes.added == {str(tmpdir / 'foo')}
+    assert [page.content for page in pages] == ['firis']
+
+
+def test_watcher_poll_deleted_before_load(tmpdir):
+    (tmpdir / 'foo').write_text('sophie: prachta\n---\nfiris')
+
+    def load_page(path):
+        path.unlink()
+        return pagelib.load_page(path)
+
+    watcher = watchlib.Watcher(tmpdir, page_loader=load_page)
+    changes, pages = watcher.poll()
+    assert not changes
+    assert pages == []